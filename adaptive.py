@@ -0,0 +1,292 @@
+import math
+import random
+import sqlite3
+import threading
+import time
+from array import array
+
+import db
+from item_stats import MIN_ATTEMPTS, discrimination
+from question_store import norm_area
+
+# =========================================================
+# QUIZ ADAPTATIVO (AMOSTRAGEM PONDERADA)
+# =========================================================
+# Peso de cada questão = fator de dificuldade x taxa de erro global
+# (suavizada). Por área há uma árvore de Fenwick com os pesos: sortear k
+# questões sem reposição custa O(k log n) e cada resposta atualiza um peso
+# em O(log n). A recência do usuário entra por rejeição no sorteio.
+# A unidade do sorteio é o cluster de quase-duplicatas (near_dup.py): a
+# estatística é somada sobre todas as variações do cluster, a recência é a da
+# variação vista mais recentemente, e sai uma questão por cluster.
+
+DIFFICULTY_WEIGHT = {
+    "basico": 0.8,
+    "Fácil": 0.8,
+    "Média": 1.0,
+    "Difícil": 1.3,
+}
+
+# questões vistas há menos que isso pelo usuário ficam menos prováveis
+RECENT_HALF_LIFE = 60 * 60 * 24
+
+# discriminação negativa (quem vai bem erra mais): provável gabarito/enunciado
+# problemático, então a questão aparece bem menos até ser revisada
+NEGATIVE_DISCRIMINATION_FACTOR = 0.25
+
+# com contadores compartilhados, os samplers são remontados de tempos em tempos
+# para incorporar as respostas dadas nos outros workers
+SAMPLER_REFRESH_INTERVAL = 300.0
+
+
+class FenwickSampler:
+    """Árvore de Fenwick (BIT) sobre pesos, com sorteio por descida nas somas prefixas."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        self.n = n
+        self.weights = array("d", weights)
+        tree = array("d", [0.0]) * (n + 1)
+        # construção O(n)
+        for i in range(1, n + 1):
+            tree[i] += self.weights[i - 1]
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self.tree = tree
+        self._top = 1 << (n.bit_length() - 1) if n else 0
+
+    def total(self):
+        s, i = 0.0, self.n
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+    def add(self, i, delta):
+        self.weights[i] += delta
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def set(self, i, w):
+        self.add(i, w - self.weights[i])
+
+    def find(self, target):
+        """Menor índice cuja soma prefixa ultrapassa `target`."""
+        pos = 0
+        step = self._top
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return min(pos, self.n - 1)
+
+    def sample(self, k, rng=random, accept=None, max_tries=None):
+        """
+        Até `k` índices distintos, proporcionais ao peso.
+
+        Os sorteados são zerados durante o sorteio e restaurados no fim.
+        `accept(i)` -> probabilidade de aceitar o índice i (rejeição).
+        """
+        picked = []
+        rejected = []
+        saved = []
+        tries = 0
+        max_tries = max_tries or 4 * k + 16
+        try:
+            while len(picked) < k and tries < max_tries:
+                total = self.total()
+                if total <= 0:
+                    break
+                tries += 1
+                i = self.find(rng.random() * total)
+                w = self.weights[i]
+                if w <= 0:
+                    continue
+                saved.append((i, w))
+                self.set(i, 0.0)
+                if accept is None or rng.random() < accept(i):
+                    picked.append(i)
+                else:
+                    rejected.append(i)
+        finally:
+            for i, w in saved:
+                self.set(i, w)
+        # faltou (usuário já viu quase tudo): completa com os rejeitados
+        return picked + rejected[:k - len(picked)]
+
+
+def _recency_accept(recent, ids, now):
+    """
+    Probabilidade de aceitar o sorteio i: cai para quem foi visto há pouco.
+    `recent` é {cluster: última vez que o usuário viu alguma variação}.
+    """
+    def accept(i):
+        seen = recent.get(ids[i])
+        if seen is None:
+            return 1.0
+        return 1.0 - math.exp(-(now - seen) * math.log(2) / RECENT_HALF_LIFE) + 0.05
+    return accept
+
+
+class AdaptiveSelector:
+    """
+    Monta quizzes ponderados por área.
+
+    Samplers são criados na primeira vez que a área é pedida; a estatística
+    global de erros vem dos contadores compartilhados (`item_stats`) ou, sem
+    eles, do histórico (attempts.sqlite3), e é atualizada a cada resposta
+    com `observe`.
+    """
+
+    def __init__(self, store, attempts_path=None, item_stats=None):
+        self.store = store
+        self.attempts_path = attempts_path
+        self.item_stats = item_stats
+        self._stats = None          # qid -> [tentativas, erros]
+        self._samplers = {}         # área -> (sampler, clusters, {cluster: índice}, [estatística])
+        self._built = {}            # área -> instante da montagem
+        self._lock = threading.Lock()
+
+    def reset(self, store):
+        """Banco recarregado: samplers são remontados sob demanda."""
+        with self._lock:
+            self.store = store
+            self._samplers = {}
+            self._built = {}
+
+    # ---------- estatística global ----------
+    def _load_stats(self):
+        stats = {}
+        if self.attempts_path:
+            try:
+                conn = db.connect(self.attempts_path)
+                try:
+                    rows = conn.execute(
+                        "SELECT qid, COUNT(*), SUM(1 - correct) FROM attempts GROUP BY qid"
+                    ).fetchall()
+                finally:
+                    conn.close()
+                stats = {qid: [n, wrong] for qid, n, wrong in rows}
+            except sqlite3.Error:
+                stats = {}
+        return stats
+
+    def _ensure_stats(self):
+        if self._stats is None:
+            self._stats = self._load_stats()
+        return self._stats
+
+    def cluster_stats(self, cid):
+        """[tentativas, erros, discriminação ou None] somados sobre as variações do cluster."""
+        members = self.store.cluster_members(cid)
+        if self.item_stats is None:
+            n = wrong = 0
+            for qid in members:
+                st = self._stats.get(qid)
+                if st:
+                    n += st[0]
+                    wrong += st[1]
+            return [n, wrong, None]
+        pooled = None
+        for qid in members:
+            row = self.item_stats.raw(qid)
+            if row is not None:
+                pooled = list(row) if pooled is None else [a + b for a, b in zip(pooled, row)]
+        if pooled is None:
+            return [0, 0, None]
+        n = pooled[1]
+        return [n, n - pooled[2], discrimination(pooled) if n >= MIN_ATTEMPTS else None]
+
+    def weight(self, cid, stats=None):
+        """Peso de sorteio do cluster (dificuldade do representante x taxa de erro do cluster)."""
+        q = self.store.get(cid)
+        if q is None:
+            return 0.0
+        n, wrong, r_pb = stats or self.cluster_stats(cid)
+        diff = DIFFICULTY_WEIGHT.get(q.get("difficulty"), 1.0)
+        # taxa de erro com prior Beta(1, 1): questão nova vale 0.5
+        err = (wrong + 1) / (n + 2)
+        w = diff * (0.25 + err)
+        if r_pb is not None and r_pb < 0:
+            w *= NEGATIVE_DISCRIMINATION_FACTOR
+        return w
+
+    def _sampler(self, area):
+        entry = self._samplers.get(area)
+        now = time.monotonic()
+        if entry is not None and self.item_stats is not None:
+            if now - self._built.get(area, now) > SAMPLER_REFRESH_INTERVAL:
+                entry = None
+        if entry is None:
+            if self.item_stats is None:
+                self._ensure_stats()
+            ids = self.store.clusters_by_area(area)
+            stats = [self.cluster_stats(cid) for cid in ids]
+            sampler = FenwickSampler([self.weight(cid, st) for cid, st in zip(ids, stats)])
+            entry = (sampler, ids, None, stats)
+            self._samplers[area] = entry
+            self._built[area] = now
+        return entry
+
+    def observe(self, qid, is_correct):
+        """Atualização incremental (O(log n)) após cada resposta."""
+        with self._lock:
+            if self.item_stats is None:
+                # sem contadores compartilhados, soma no dicionário local
+                st = self._ensure_stats().setdefault(qid, [0, 0])
+                st[0] += 1
+                if not is_correct:
+                    st[1] += 1
+
+            q = self.store.get(qid)
+            area = norm_area((q or {}).get("area"))
+            entry = self._samplers.get(area)
+            if entry is None:
+                return
+            sampler, ids, index, stats = entry
+            if index is None:
+                index = {x: i for i, x in enumerate(ids)}
+                self._samplers[area] = (sampler, ids, index, stats)
+            i = index.get(self.store.cluster_of(qid))
+            if i is not None:
+                # soma no agregado do cluster (a discriminação só muda na remontagem)
+                st = stats[i]
+                st[0] += 1
+                if not is_correct:
+                    st[1] += 1
+                sampler.set(i, self.weight(ids[i], st))
+
+    def recent_by_cluster(self, recent):
+        """{qid: visto em} -> {cluster: última vez que alguma variação foi vista}."""
+        out = {}
+        cluster_of = self.store.cluster_of
+        for qid, seen in recent.items():
+            cid = cluster_of(qid)
+            if cid not in out or seen > out[cid]:
+                out[cid] = seen
+        return out
+
+    def sample(self, area, k, recent=None, now=None, rng=random):
+        """
+        Sorteia até `k` ids da área sem reposição (um por cluster).
+
+        `recent.items()` -> (qid, timestamp da última vez que o usuário viu);
+        vale para o cluster inteiro da questão.
+        """
+        now = now or time.time()
+        area = norm_area(area)
+        by_cluster = self.recent_by_cluster(recent) if recent else None
+        with self._lock:
+            sampler, ids, _, _ = self._sampler(area)
+            accept = _recency_accept(by_cluster, ids, now) if by_cluster else None
+            picked = sampler.sample(min(k, sampler.n), rng=rng, accept=accept)
+        out = []
+        for i in picked:
+            members = self.store.cluster_members(ids[i])
+            out.append(members[rng.randrange(len(members))] if len(members) > 1 else ids[i])
+        return out
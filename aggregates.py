@@ -0,0 +1,97 @@
+# =========================================================
+# AGREGADOS INCREMENTAIS DE DESEMPENHO
+# =========================================================
+# Atualizados a cada resposta (O(1)), então o resultado e qualquer painel
+# só leem o que já está pronto. O mesmo formato serve para um quiz e para o
+# acumulado do usuário entre quizzes (`merge`).
+#
+#   area / diff -> {chave: [total, acertos]}
+#   wrong       -> ids errados (ordem de resposta, sem repetição)
+#   streak      -> acertos seguidos atuais; best -> maior sequência
+#   time_ms / timed -> soma das latências medidas e quantas foram medidas
+
+
+def new_aggregate():
+    return {
+        "total": 0,
+        "correct": 0,
+        "area": {},
+        "diff": {},
+        "wrong": [],
+        "streak": 0,
+        "best": 0,
+        "time_ms": 0,
+        "timed": 0,
+    }
+
+
+def _bump(table, key, is_correct):
+    t = table.get(key)
+    if t is None:
+        t = table[key] = [0, 0]
+    t[0] += 1
+    if is_correct:
+        t[1] += 1
+
+
+def observe(agg, qid, area, difficulty, is_correct, latency_ms=None):
+    """Incorpora uma resposta."""
+    agg["total"] += 1
+    _bump(agg["area"], area or "", is_correct)
+    if difficulty:
+        _bump(agg["diff"], difficulty, is_correct)
+
+    if is_correct:
+        agg["correct"] += 1
+        agg["streak"] += 1
+        if agg["streak"] > agg["best"]:
+            agg["best"] = agg["streak"]
+    else:
+        agg["streak"] = 0
+        if qid not in agg["wrong"]:
+            agg["wrong"].append(qid)
+
+    if latency_ms is not None and latency_ms >= 0:
+        agg["time_ms"] += int(latency_ms)
+        agg["timed"] += 1
+    return agg
+
+
+def merge(into, agg, max_wrong: int = 200):
+    """Soma `agg` em `into` (acumulado entre quizzes)."""
+    into["total"] += agg["total"]
+    into["correct"] += agg["correct"]
+    for key in ("area", "diff"):
+        for k, (total, correct) in agg[key].items():
+            t = into[key].setdefault(k, [0, 0])
+            t[0] += total
+            t[1] += correct
+    wrong = into["wrong"]
+    for qid in agg["wrong"]:
+        if qid not in wrong:
+            wrong.append(qid)
+    del wrong[:-max_wrong]
+    # quiz todo certo continua a sequência que vinha do acumulado
+    into["streak"] = agg["streak"] if agg["streak"] < agg["total"] else into["streak"] + agg["streak"]
+    into["best"] = max(into["best"], agg["best"], into["streak"])
+    into["time_ms"] += agg["time_ms"]
+    into["timed"] += agg["timed"]
+    return into
+
+
+def tallies(table):
+    """{chave: {"total", "correct"}} no formato que os templates usam."""
+    return {k: {"total": t, "correct": c} for k, (t, c) in table.items()}
+
+
+def summary(agg):
+    return {
+        "total": agg["total"],
+        "correct": agg["correct"],
+        "per_area": tallies(agg["area"]),
+        "per_difficulty": tallies(agg["diff"]),
+        "wrong_ids": list(agg["wrong"]),
+        "streak": agg["streak"],
+        "best_streak": agg["best"],
+        "avg_time_ms": (agg["time_ms"] // agg["timed"]) if agg["timed"] else None,
+    }
@@ -0,0 +1,268 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from urllib.parse import quote
+
+from markupsafe import Markup
+
+try:
+    import brotli
+except ImportError:  # sem brotli, só .gz
+    brotli = None
+
+# =========================================================
+# ASSETS ESTÁTICOS: NOMES COM HASH + VARIANTES COMPRIMIDAS
+# =========================================================
+# `build_assets` gera em static/build/:
+#   app.<hash>.css   style.css minificado + subconjunto de ícones usados
+#   quiz.<hash>.js, logo.<hash>.png
+#   *.gz / *.br      servidos direto pelo WhiteNoise (Content-Encoding)
+#   manifest.json    nome lógico -> arquivo com hash + CSS crítico
+# O hash muda junto com o conteúdo, então essas URLs podem ser cacheadas
+# para sempre (Cache-Control immutable). O CSS acima da marca
+# "fim do CSS crítico" vai inline no <head>; o resto carrega sem bloquear.
+#
+# Um build novo escreve ao lado do anterior e só apaga gerações mais velhas
+# que KEEP_GENERATIONS: durante o deploy, páginas já em cache (CDN,
+# navegador, service worker) e workers antigos, cujo índice do WhiteNoise
+# aponta para os arquivos velhos, continuam achando o que referenciam.
+
+log = logging.getLogger("lexquiz.assets")
+
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 2
+KEEP_GENERATIONS = 2
+CRITICAL_MARK = "/* ================= fim do CSS crítico ================= */"
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html")
+# só vale guardar a variante se ela economizar pelo menos isso
+MIN_SAVING = 0.05
+
+HASHED_RE = re.compile(r"\.[0-9a-f]{12}\.[a-z0-9]+$")
+
+# ícones (traço 24x24) no lugar do Font Awesome; as chaves são as classes fa-*
+ICONS = {
+    "house": '<path d="M3 9l9-7 9 7v11a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2z"/><path d="M9 22V12h6v10"/>',
+    "magnifying-glass": '<circle cx="11" cy="11" r="8"/><path d="M21 21l-4.35-4.35"/>',
+    "rotate": '<path d="M1 4v6h6"/><path d="M3.51 15a9 9 0 1 0 2.13-9.36L1 10"/>',
+    "redo": '<path d="M23 4v6h-6"/><path d="M20.49 15a9 9 0 1 1-2.12-9.36L23 10"/>',
+    "circle-exclamation": '<circle cx="12" cy="12" r="10"/><path d="M12 8v4"/><path d="M12 16h.01"/>',
+    "arrow-right": '<path d="M5 12h14"/><path d="M12 5l7 7-7 7"/>',
+    "book": '<path d="M4 19.5A2.5 2.5 0 0 1 6.5 17H20"/><path d="M6.5 2H20v20H6.5A2.5 2.5 0 0 1 4 19.5v-15A2.5 2.5 0 0 1 6.5 2z"/>',
+    "book-reader": '<path d="M2 3h6a4 4 0 0 1 4 4v14a3 3 0 0 0-3-3H2z"/><path d="M22 3h-6a4 4 0 0 0-4 4v14a3 3 0 0 1 3-3h7z"/>',
+    "check": '<path d="M20 6L9 17l-5-5"/>',
+    "check-circle": '<path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"/><path d="M22 4L12 14.01l-3-3"/>',
+    "times": '<path d="M18 6L6 18"/><path d="M6 6l12 12"/>',
+    "times-circle": '<circle cx="12" cy="12" r="10"/><path d="M15 9l-6 6"/><path d="M9 9l6 6"/>',
+    "clock": '<circle cx="12" cy="12" r="10"/><path d="M12 6v6l4 2"/>',
+    "stopwatch": '<circle cx="12" cy="13" r="8"/><path d="M12 13V9"/><path d="M10 2h4"/><path d="M19 6l-1.5 1.5"/>',
+    "graduation-cap": '<path d="M22 10L12 5 2 10l10 5 10-5z"/><path d="M6 12v5c3 2 9 2 12 0v-5"/><path d="M22 10v6"/>',
+    "layer-group": '<path d="M12 2L2 7l10 5 10-5-10-5z"/><path d="M2 17l10 5 10-5"/><path d="M2 12l10 5 10-5"/>',
+    "lightbulb": '<path d="M9 18h6"/><path d="M10 22h4"/><path d="M12 2a7 7 0 0 0-4 12.7V17h8v-2.3A7 7 0 0 0 12 2z"/>',
+    "sign-out-alt": '<path d="M9 21H5a2 2 0 0 1-2-2V5a2 2 0 0 1 2-2h4"/><path d="M16 17l5-5-5-5"/><path d="M21 12H9"/>',
+    "users": '<path d="M17 21v-2a4 4 0 0 0-4-4H5a4 4 0 0 0-4 4v2"/><circle cx="9" cy="7" r="4"/><path d="M23 21v-2a4 4 0 0 0-3-3.87"/><path d="M16 3.13a4 4 0 0 1 0 7.75"/>',
+    "trophy": '<path d="M8 21h8"/><path d="M12 17v4"/><path d="M7 4h10v5a5 5 0 0 1-10 0z"/><path d="M17 5h3v2a3 3 0 0 1-3 3"/><path d="M7 5H4v2a3 3 0 0 0 3 3"/>',
+    "cloud-arrow-down": '<path d="M8 17l4 4 4-4"/><path d="M12 12v9"/><path d="M20.88 18.09A5 5 0 0 0 18 9h-1.26A8 8 0 1 0 3 16.29"/>',
+    "toggle-on": '<rect x="1" y="5" width="22" height="14" rx="7"/><circle cx="16" cy="12" r="3"/>',
+}
+ICONS["home"] = ICONS["house"]
+
+_ICON_RE = re.compile(r"\bfa-([a-z0-9-]+)")
+_ICON_BASES = ("solid", "regular", "brands")
+
+ICON_BASE_CSS = (
+    ":is(.fa-solid,.fas,.far,.fa-regular)[class*=' fa-']{display:inline-block;width:1em;height:1em;"
+    "vertical-align:-.125em;background-color:currentColor;"
+    "-webkit-mask:var(--fa) center/contain no-repeat;mask:var(--fa) center/contain no-repeat}"
+)
+
+
+# ---------- CSS ----------
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def used_icons(*dirs):
+    """Nomes fa-* usados nos templates/scripts (sem as classes de estilo)."""
+    names = set()
+    for d in dirs:
+        for root, _, files in os.walk(d):
+            if os.path.basename(root) == BUILD_DIR:
+                continue
+            for name in files:
+                if name.endswith((".html", ".js")):
+                    with open(os.path.join(root, name), encoding="utf-8") as f:
+                        names.update(_ICON_RE.findall(f.read()))
+    return sorted(n for n in names if n not in _ICON_BASES)
+
+
+def icon_css(names):
+    rules = [ICON_BASE_CSS]
+    for name in names:
+        body = ICONS.get(name)
+        if body is None:
+            log.warning("ícone sem desenho local: fa-%s", name)
+            continue
+        svg = (
+            "<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 24 24' fill='none' stroke='black' "
+            f"stroke-width='2' stroke-linecap='round' stroke-linejoin='round'>{body.replace(chr(34), chr(39))}</svg>"
+        )
+        rules.append(f'.fa-{name}{{--fa:url("data:image/svg+xml,{quote(svg, safe=" =:/,.-")}")}}')
+    return "".join(rules)
+
+
+# ---------- build ----------
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_variants(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    if not path.endswith(COMPRESSIBLE):
+        return
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    for ext, packed in variants:
+        if len(packed) < len(data) * (1 - MIN_SAVING):
+            with open(path + ext, "wb") as f:
+                f.write(packed)
+
+
+def _source_stamps(static_dir, templates_dir):
+    stamps = {}
+    for d in (static_dir, templates_dir):
+        for root, dirs, files in os.walk(d):
+            dirs[:] = [x for x in dirs if x.split(".", 1)[0] != BUILD_DIR]
+            for name in files:
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                stamps[os.path.relpath(path, os.path.dirname(d))] = [st.st_mtime_ns, st.st_size]
+    return stamps
+
+
+def _generations(out_dir):
+    """Arquivos de cada build ainda em static/build/ (o mais novo primeiro)."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if "generations" in manifest:
+        return manifest["generations"]
+    # manifesto de antes das gerações: o build atual são os arquivos dele
+    names = [path.rsplit("/", 1)[-1] for path in manifest.get("files", {}).values()]
+    return [[n + ext for n in names for ext in ("", ".gz", ".br")]]
+
+
+def build_assets(static_dir, templates_dir):
+    """Gera um build novo em static/build/ (mantendo o anterior) e devolve o manifesto."""
+    out_dir = os.path.join(static_dir, BUILD_DIR)
+    tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    files = {}
+
+    with open(os.path.join(static_dir, "style.css"), encoding="utf-8") as f:
+        css = f.read()
+    critical, _, _ = css.partition(CRITICAL_MARK)
+    icons = icon_css(used_icons(templates_dir, static_dir))
+    bundle = (minify_css(css) + icons).encode("utf-8")
+    name = f"app.{_digest(bundle)}.css"
+    write_variants(os.path.join(tmp_dir, name), bundle)
+    files["style.css"] = f"{BUILD_DIR}/{name}"
+
+    for logical in sorted(os.listdir(static_dir)):
+        src = os.path.join(static_dir, logical)
+        if logical == "style.css" or not os.path.isfile(src):
+            continue
+        with open(src, "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(logical)
+        name = f"{stem}.{_digest(data)}{ext}"
+        write_variants(os.path.join(tmp_dir, name), data)
+        files[logical] = f"{BUILD_DIR}/{name}"
+
+    os.makedirs(out_dir, exist_ok=True)
+    current = sorted(os.listdir(tmp_dir))
+    generations = [current] + [g for g in _generations(out_dir) if g != current][:KEEP_GENERATIONS - 1]
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "files": files,
+        "critical_css": minify_css(critical),
+        "sources": _source_stamps(static_dir, templates_dir),
+        "generations": generations,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    # arquivos novos ao lado dos antigos; o manifesto entra por último
+    for name in current:
+        os.replace(os.path.join(tmp_dir, name), os.path.join(out_dir, name))
+    os.replace(os.path.join(tmp_dir, MANIFEST), os.path.join(out_dir, MANIFEST))
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    keep = {name for g in generations for name in g}
+    keep.add(MANIFEST)
+    for name in os.listdir(out_dir):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except OSError:
+                pass  # outro worker já apagou (ou é um diretório)
+    return manifest
+
+
+def load_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, BUILD_DIR, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def ensure_assets(static_dir, templates_dir):
+    """Manifesto atual; refaz o build se alguma fonte mudou. None se não deu para gerar."""
+    manifest = load_manifest(static_dir)
+    try:
+        if manifest is None or manifest.get("sources") != _source_stamps(static_dir, templates_dir):
+            manifest = build_assets(static_dir, templates_dir)
+    except OSError as e:
+        # outro worker pode ter acabado de gerar; senão (static/ só leitura)
+        # segue com os nomes originais
+        manifest = load_manifest(static_dir)
+        if manifest is None:
+            log.warning("assets não gerados (%s); usando arquivos sem hash", e)
+    return manifest
+
+
+def is_immutable(path, url):
+    """Para o WhiteNoise: arquivos com hash no nome ganham cache de 1 ano + immutable."""
+    return f"/{BUILD_DIR}/" in url and bool(HASHED_RE.search(url.rsplit("?", 1)[0]))
+
+
+class Assets:
+    """Helper dos templates: `asset_url('quiz.js')` e `critical_css`."""
+
+    def __init__(self, manifest, url_for_static):
+        self.manifest = manifest or {}
+        self._files = self.manifest.get("files", {})
+        self._url_for_static = url_for_static
+        self.critical_css = Markup(self.manifest.get("critical_css", ""))
+
+    @property
+    def built(self):
+        return bool(self._files)
+
+    def url(self, name):
+        return self._url_for_static(self._files.get(name, name))
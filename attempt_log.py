@@ -0,0 +1,159 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import db
+
+# =========================================================
+# LOG PERSISTENTE DE TENTATIVAS
+# =========================================================
+# /answer só faz um put_nowait numa fila em memória; uma thread em segundo
+# plano esvazia a fila em lotes (uma transação por lote) no SQLite local.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    user_key TEXT NOT NULL,
+    qid INTEGER NOT NULL,
+    chosen INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    latency_ms INTEGER,
+    mode TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_user ON attempts (user_key, ts);
+CREATE INDEX IF NOT EXISTS attempts_qid ON attempts (qid);
+"""
+
+log = logging.getLogger("lexquiz.attempts")
+
+_INSERT = (
+    "INSERT INTO attempts (ts, user_key, qid, chosen, correct, latency_ms, mode)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def connect(path: str):
+    # transações explícitas (`with conn:`), uma por lote
+    return db.connect(path, check_same_thread=False)
+
+
+class AttemptLog:
+    """
+    Grava cada resposta no SQLite sem bloquear o request.
+
+    - fila limitada (`queue_size`): se encher, a tentativa é descartada e
+      contada em `dropped` em vez de atrasar /answer;
+    - a thread grava a cada `flush_interval` segundos ou a cada `batch_size`
+      registros, o que vier primeiro;
+    - no encerramento do worker (atexit) a fila é esvaziada;
+    - lote que falha no SQLite (trava além do timeout) fica guardado e é
+      gravado de novo na rodada seguinte, sem derrubar a thread.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 500,
+                 queue_size: int = 10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._retry = []
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    # ---------- lado do request ----------
+    def record(self, user_key, qid, chosen, correct, latency_ms=None, mode="treino", ts=None):
+        self._ensure_writer()
+        row = (ts or time.time(), user_key, qid, chosen, int(bool(correct)), latency_ms, mode)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    # ---------- thread de escrita ----------
+    def _ensure_writer(self):
+        # a thread não sobrevive ao fork do gunicorn: cria uma por processo
+        # (e uma nova se a anterior morreu)
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="attempt-log", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _drain(self, conn, first=None):
+        with self._write_lock:
+            batch, self._retry = self._retry, []
+            if first is not None:
+                batch.append(first)
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return 0
+            try:
+                with conn:
+                    conn.executemany(_INSERT, batch)
+            except sqlite3.Error:
+                log.warning("falha ao gravar %d tentativas; nova tentativa no próximo ciclo",
+                            len(batch), exc_info=True)
+                self._retry = batch
+                return 0
+            return len(batch)
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while not self._stop.is_set():
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    if self._retry:
+                        self._drain(conn)
+                    continue
+                # junta o que chegar até o fim do intervalo (ou encher o lote)
+                deadline = time.monotonic() + self.flush_interval
+                while self._queue.qsize() < self.batch_size - 1 and time.monotonic() < deadline:
+                    if self._stop.wait(0.05):
+                        break
+                self._drain(conn, first)
+            while self._drain(conn):
+                pass
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Grava imediatamente o que está na fila (usado em testes/CLI)."""
+        conn = connect(self.path)
+        try:
+            while self._drain(conn):
+                pass
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout=max(5.0, self.flush_interval * 2))
+        self._thread = None
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# =========================================================
+# BANCO DE QUESTÕES EXTERNO + CACHE COMPILADO
+# =========================================================
+# Fontes aceitas: .json (lista ou {"questions": [...]}), .jsonl (uma questão
+# por linha) ou SQLite (.sqlite/.sqlite3/.db, tabela `questions`).
+# Na primeira carga a fonte é validada e compilada num pickle versionado;
+# as próximas cargas só conferem mtime/tamanho (e o hash, se preciso).
+
+CACHE_VERSION = 1
+
+log = logging.getLogger("lexquiz.bank")
+
+REQUIRED_FIELDS = ("id", "area", "q", "options", "answer")
+
+
+class BankError(ValueError):
+    """Fonte do banco inválida (mensagens por questão em `errors`)."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors[:5]) + (" ..." if len(errors) > 5 else ""))
+        self.errors = errors
+
+
+# ---------- leitura das fontes ----------
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("questions", [])
+    return data
+
+
+def _read_jsonl(path):
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                out.append(json.loads(line))
+            except ValueError as e:
+                raise BankError([f"linha {lineno}: JSON inválido ({e})"])
+    return out
+
+
+def _read_sqlite(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT * FROM questions ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    out = []
+    for row in rows:
+        q = dict(row)
+        for key in ("options", "tags"):
+            if isinstance(q.get(key), str):
+                q[key] = json.loads(q[key])
+        out.append({k: v for k, v in q.items() if v is not None})
+    return out
+
+
+def read_source(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".jsonl":
+        return _read_jsonl(path)
+    if ext == ".json":
+        return _read_json(path)
+    if ext in (".sqlite", ".sqlite3", ".db"):
+        return _read_sqlite(path)
+    raise BankError([f"formato de banco não suportado: {path}"])
+
+
+# ---------- validação ----------
+def validate(questions, areas=None):
+    """Lista de erros (vazia = ok)."""
+    errors = []
+    seen = set()
+    areas = set(areas) if areas else None
+    for i, q in enumerate(questions):
+        where = f"questão #{i + 1}"
+        if not isinstance(q, dict):
+            errors.append(f"{where}: não é um objeto")
+            continue
+        missing = [k for k in REQUIRED_FIELDS if k not in q]
+        if missing:
+            errors.append(f"{where}: faltam campos {', '.join(missing)}")
+            continue
+        qid = q["id"]
+        where = f"questão id={qid}"
+        if not isinstance(qid, int) or qid <= 0:
+            errors.append(f"{where}: id deve ser inteiro positivo")
+        elif qid in seen:
+            errors.append(f"{where}: id repetido")
+        seen.add(qid)
+        if areas is not None and (q["area"] or "").strip() not in areas:
+            errors.append(f"{where}: área desconhecida {q['area']!r}")
+        opts = q["options"]
+        if not isinstance(opts, list) or len(opts) < 2 or not all(isinstance(o, str) for o in opts):
+            errors.append(f"{where}: options deve ser lista com 2+ textos")
+        elif not isinstance(q["answer"], int) or not 0 <= q["answer"] < len(opts):
+            errors.append(f"{where}: answer fora das alternativas")
+        if "tags" in q and not isinstance(q["tags"], list):
+            errors.append(f"{where}: tags deve ser lista")
+    return errors
+
+
+# ---------- cache compilado ----------
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def default_cache_path(source, cache_dir):
+    tag = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()[:10]
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(cache_dir, f"{name}.{tag}.bank")
+
+
+def compile_bank(source, cache_path, areas=None):
+    """Valida a fonte e grava o artefato compilado (escrita atômica). Retorna o header."""
+    questions = read_source(source)
+    errors = validate(questions, areas)
+    if errors:
+        raise BankError(errors)
+
+    mtime_ns, size = _fingerprint(source)
+    header = {
+        "format": CACHE_VERSION,
+        "source": os.path.abspath(source),
+        "mtime_ns": mtime_ns,
+        "size": size,
+        "sha256": file_hash(source),
+        "count": len(questions),
+        "compiled_at": time.time(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(tuple(questions), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cache_path)
+    return header
+
+
+def _read_header(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _read_cache(cache_path):
+    with open(cache_path, "rb") as f:
+        header = pickle.load(f)
+        return header, pickle.load(f)
+
+
+def load_bank(source, cache_path, areas=None):
+    """
+    (header, questões) a partir do cache; recompila se a fonte mudou.
+
+    mtime/tamanho iguais -> usa o cache direto. Se mudaram mas o sha256 é o
+    mesmo (ex.: `touch`), também reaproveita.
+    """
+    header = _read_header(cache_path)
+    if header and header.get("format") == CACHE_VERSION and header.get("source") == os.path.abspath(source):
+        if (header["mtime_ns"], header["size"]) == _fingerprint(source) or header["sha256"] == file_hash(source):
+            try:
+                return _read_cache(cache_path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+    compile_bank(source, cache_path, areas)
+    return _read_cache(cache_path)
+
+
+class BankReloader:
+    """
+    Confere a fonte a cada `interval` segundos (um os.stat) e, se mudou,
+    carrega o banco novo e chama `on_reload(header, questions)` para trocar
+    o QuestionStore sem reiniciar o gunicorn.
+    """
+
+    def __init__(self, source, cache_path, on_reload, areas=None, interval: float = 5.0):
+        self.source = source
+        self.cache_path = cache_path
+        self.on_reload = on_reload
+        self.areas = areas
+        self.interval = interval
+        self._fingerprint = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        header, questions = load_bank(self.source, self.cache_path, self.areas)
+        self._fingerprint = _fingerprint(self.source)
+        self.on_reload(header, questions)
+        return header
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = now + self.interval
+            try:
+                fp = _fingerprint(self.source)
+            except OSError:
+                return False
+            if fp == self._fingerprint:
+                return False
+            try:
+                self.load()
+            except (BankError, OSError, ValueError) as e:
+                # fonte quebrada no meio da edição: mantém o banco atual
+                log.warning("banco %s não recarregado: %s", self.source, e)
+                self._fingerprint = fp
+                return False
+            return True
+        finally:
+            self._lock.release()
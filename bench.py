@@ -0,0 +1,513 @@
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from bank_loader import read_source
+from question_bank import generate_extra_questions
+
+# =========================================================
+# BENCHMARK DO FLUXO COMPLETO DO QUIZ
+# =========================================================
+# Cada usuário virtual faz: / -> /start -> N x (/q + /answer [+ /next])
+# -> /result -> /review -> /q. O banco é ampliado com questões geradas por
+# template até o tamanho pedido, e cada rodada usa um instance/ próprio
+# (sessões, histórico e SRS não se misturam com os dados de desenvolvimento).
+#
+#   python bench.py run --sizes 1000,10000 --users 40 --concurrency 8 --out bench.json
+#   python bench.py run --target gunicorn --workers 2 --sizes 1000
+#   python bench.py compare bench-baseline.json bench.json --threshold 0.15
+#
+# "client" usa o test client do Flask num subprocesso (sem rede);
+# "gunicorn" sobe `gunicorn app:app` local e mede via HTTP.
+
+root_dir = os.path.dirname(os.path.abspath(__file__))
+BASE_BANK = os.path.join(root_dir, "data", "questions.jsonl")
+
+ROUTES = ("GET /", "POST /start", "GET /q", "POST /answer", "GET /next", "GET /result", "GET /review")
+FEEDBACK_MODES = ("treino", "revisao", "adaptativo")
+
+# abaixo disso a diferença de latência é ruído de medição
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+# ---------- banco sintético ----------
+def prepare_bank(size, workdir, seed=0):
+    """Banco curado + questões geradas até `size`. Retorna (caminho, total, áreas)."""
+    base = read_source(BASE_BANK)
+    start_id = max(q["id"] for q in base) + 1
+    extra = max(0, size - len(base))
+    path = os.path.join(workdir, f"bank-{size}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for q in base:
+            f.write(json.dumps(q, ensure_ascii=False) + "\n")
+        if extra:
+            for q in generate_extra_questions(start_id, start_id + extra - 1, seed=seed):
+                f.write(json.dumps(q, ensure_ascii=False) + "\n")
+    areas = sorted({q["area"] for q in base})
+    return path, len(base) + extra, areas
+
+
+def bench_env(bank_path, instance_path):
+    env = dict(os.environ)
+    env.update(
+        LEXQUIZ_BANK=bank_path,
+        LEXQUIZ_INSTANCE_PATH=instance_path,
+        LEXQUIZ_BANK_CHECK_INTERVAL="3600",
+        SECRET_KEY=env.get("SECRET_KEY") or "bench-secret",
+    )
+    return env
+
+
+# ---------- medição ----------
+def percentile(values, p):
+    """Percentil por posição (valores já ordenados)."""
+    if not values:
+        return None
+    k = max(0, math.ceil(p / 100.0 * len(values)) - 1)
+    return values[k]
+
+
+def rss_mb(pid):
+    """RSS atual do processo (Linux: /proc); None se indisponível."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    if pid == os.getpid():
+        try:
+            import resource
+            return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+        except ImportError:
+            pass
+    return None
+
+
+def child_pids(ppid):
+    out = []
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return out
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == ppid:
+            out.append(int(name))
+    return sorted(out)
+
+
+class Recorder:
+    """Latências por rota e maior cookie de sessão por passo (thread-safe)."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.cookie_bytes = {}
+        self._lock = threading.Lock()
+
+    def add(self, label, ms, ok, cookie_len):
+        with self._lock:
+            self.latencies.setdefault(label, []).append(ms)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+            if cookie_len > self.cookie_bytes.get(label, 0):
+                self.cookie_bytes[label] = cookie_len
+
+    def report(self):
+        routes = {}
+        for label, values in self.latencies.items():
+            values.sort()
+            routes[label] = {
+                "count": len(values),
+                "errors": self.errors.get(label, 0),
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "max_ms": round(values[-1], 3),
+            }
+        return routes
+
+
+# ---------- transportes ----------
+class TestClientTransport:
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+        self.cookie_name = flask_app.config["SESSION_COOKIE_NAME"]
+
+    def request(self, method, path, data=None):
+        resp = self.client.open(path, method=method, data=data)
+        resp.close()
+        cookie = self.client.get_cookie(self.cookie_name)
+        return resp.status_code, len(cookie.value) if cookie else 0
+
+
+class HTTPTransport:
+    def __init__(self, host, port, cookie_name="session"):
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.cookie_name = cookie_name
+        self.cookies = {}
+
+    def request(self, method, path, data=None):
+        headers = {}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        self.conn.request(method, path, body=body, headers=headers)
+        resp = self.conn.getresponse()
+        resp.read()
+        for header in resp.headers.get_all("Set-Cookie") or ():
+            name, _, rest = header.partition("=")
+            value = rest.split(";", 1)[0]
+            if value and "Max-Age=0" not in header:
+                self.cookies[name.strip()] = value
+            else:
+                self.cookies.pop(name.strip(), None)
+        if resp.getheader("Connection", "").lower() == "close":
+            self.conn.close()
+        return resp.status, len(self.cookies.get(self.cookie_name, ""))
+
+    def close(self):
+        self.conn.close()
+
+
+# ---------- cenário ----------
+def run_user(transport, recorder, area, mode, n, rng):
+    def step(label, method, path, data=None):
+        t0 = time.perf_counter()
+        try:
+            status, cookie_len = transport.request(method, path, data)
+            ok = status < 400
+        except (OSError, http.client.HTTPException):
+            cookie_len, ok = 0, False
+        recorder.add(label, (time.perf_counter() - t0) * 1000.0, ok, cookie_len)
+
+    step("GET /", "GET", "/")
+    step("POST /start", "POST", "/start", {"area": area, "mode": mode, "n": str(n)})
+    for _ in range(n):
+        step("GET /q", "GET", "/q")
+        step("POST /answer", "POST", "/answer", {"choice": str(rng.randrange(4))})
+        if mode in FEEDBACK_MODES:
+            step("GET /next", "GET", "/next")
+    step("GET /result", "GET", "/result")
+    step("GET /review", "GET", "/review")
+    step("GET /q", "GET", "/q")
+
+
+def drive(make_transport, users, concurrency, areas, mode, n, seed):
+    """Roda `users` cenários com `concurrency` threads. Retorna (recorder, segundos)."""
+    recorder = Recorder()
+
+    def one(i):
+        transport = make_transport()
+        try:
+            run_user(transport, recorder, areas[i % len(areas)], mode, n, random.Random(seed + i))
+        finally:
+            close = getattr(transport, "close", None)
+            if close:
+                close()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(users)))
+    return recorder, time.perf_counter() - t0
+
+
+def summarize(recorder, elapsed, **meta):
+    routes = recorder.report()
+    total = sum(r["count"] for r in routes.values())
+    meta.update(
+        elapsed_s=round(elapsed, 3),
+        requests=total,
+        errors=sum(r["errors"] for r in routes.values()),
+        rps=round(total / elapsed, 1) if elapsed else None,
+        routes=routes,
+        cookie_bytes=recorder.cookie_bytes,
+    )
+    return meta
+
+
+# ---------- alvos ----------
+def _client_child(config):
+    """Subprocesso do alvo "client": importa o app com o banco já apontado pelo env."""
+    t0 = time.perf_counter()
+    import app as lexquiz
+    boot_s = time.perf_counter() - t0
+
+    make = lambda: TestClientTransport(lexquiz.app)
+    drive(make, config["warmup"], 1, config["areas"], config["mode"], config["n"], config["seed"])
+    recorder, elapsed = drive(
+        make, config["users"], config["concurrency"], config["areas"], config["mode"], config["n"], config["seed"]
+    )
+    if lexquiz.ATTEMPT_LOG is not None:
+        lexquiz.ATTEMPT_LOG.flush()
+    lexquiz.SRS.flush()
+    result = summarize(recorder, elapsed, boot_s=round(boot_s, 3), rss_mb={"main": rss_mb(os.getpid())})
+    json.dump(result, sys.stdout)
+
+
+def run_client(config, env):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "_client", json.dumps(config)],
+        env=env, cwd=root_dir, stdout=subprocess.PIPE, check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port, proc, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn saiu com código {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("gunicorn não respondeu a tempo")
+
+
+def run_gunicorn(config, env):
+    port = _free_port()
+    cmd = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(config["workers"]),
+        "--threads", str(config["threads"]),
+        "--log-level", "warning",
+    ]
+    env = dict(env, LEXQUIZ_PRELOAD="on" if config["preload"] else "off")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, cwd=root_dir)
+    try:
+        _wait_port(port, proc, config["boot_timeout"])
+        # o bind acontece antes dos workers importarem o app: o 1º GET mede o boot
+        http_get = HTTPTransport("127.0.0.1", port)
+        http_get.request("GET", "/")
+        http_get.close()
+        boot_s = time.perf_counter() - t0
+
+        make = lambda: HTTPTransport("127.0.0.1", port)
+        drive(make, config["warmup"], 1, config["areas"], config["mode"], config["n"], config["seed"])
+        recorder, elapsed = drive(
+            make, config["users"], config["concurrency"], config["areas"], config["mode"], config["n"], config["seed"]
+        )
+        rss = {"master": rss_mb(proc.pid)}
+        for i, pid in enumerate(child_pids(proc.pid)):
+            rss[f"worker{i}"] = rss_mb(pid)
+        return summarize(recorder, elapsed, boot_s=round(boot_s, 3), rss_mb=rss)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def cmd_run(args):
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    workdir = tempfile.mkdtemp(prefix="lexquiz-bench-")
+    runs = []
+    try:
+        for size in sizes:
+            bank_path, total, areas = prepare_bank(size, workdir, seed=args.seed)
+            env = bench_env(bank_path, os.path.join(workdir, f"instance-{size}-{args.target}"))
+            config = {
+                "users": args.users,
+                "concurrency": args.concurrency,
+                "warmup": args.warmup,
+                "areas": [args.area] if args.area else areas,
+                "mode": args.mode,
+                "n": args.questions,
+                "seed": args.seed,
+                "workers": args.workers,
+                "threads": args.threads,
+                "preload": not args.no_preload,
+                "boot_timeout": args.boot_timeout,
+            }
+            print(f"[{args.target}] banco {total} questões, {args.users} usuários x {args.concurrency}...", file=sys.stderr)
+            result = run_gunicorn(config, env) if args.target == "gunicorn" else run_client(config, env)
+            result.update(
+                target=args.target,
+                bank_size=total,
+                mode=args.mode,
+                users=args.users,
+                concurrency=args.concurrency,
+                questions_per_quiz=args.questions,
+            )
+            if args.target == "gunicorn":
+                result.update(workers=args.workers, threads=args.threads, preload=not args.no_preload)
+            runs.append(result)
+            print_run(result)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": _git_commit(),
+        "runs": runs,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"resultado gravado em {args.out}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            return 1 if print_regressions(compare(json.load(f), report, args.threshold)) else 0
+    return 0
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=root_dir,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_run(result):
+    print(
+        f"\n{result['target']} | {result['bank_size']} questões | {result['rps']} req/s | "
+        f"{result['requests']} req, {result['errors']} erros | boot {result['boot_s']}s | "
+        f"RSS {result['rss_mb']}"
+    )
+    print(f"{'rota':<14}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'cookie':>8}")
+    for label in ROUTES:
+        r = result["routes"].get(label)
+        if r:
+            print(
+                f"{label:<14}{r['count']:>7}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                f"{r['p99_ms']:>10.2f}{result['cookie_bytes'].get(label, 0):>8}"
+            )
+
+
+# ---------- comparação ----------
+def _run_key(run):
+    return run["target"], run["bank_size"], run.get("mode"), run.get("workers")
+
+
+def compare(baseline, current, threshold=0.15):
+    """Lista de regressões (texto) do `current` em relação ao `baseline`."""
+    base_runs = {_run_key(r): r for r in baseline.get("runs", ())}
+    out = []
+    for run in current.get("runs", ()):
+        key = _run_key(run)
+        base = base_runs.get(key)
+        if base is None:
+            continue
+        name = f"{key[0]}/{key[1]}"
+        if base.get("rps") and run.get("rps") is not None and run["rps"] < base["rps"] * (1 - threshold):
+            out.append(f"{name}: req/s {base['rps']} -> {run['rps']}")
+        if run.get("errors", 0) > base.get("errors", 0):
+            out.append(f"{name}: erros {base.get('errors', 0)} -> {run['errors']}")
+        for label, r in run["routes"].items():
+            b = base["routes"].get(label)
+            if not b:
+                continue
+            for pct in ("p95_ms", "p99_ms"):
+                if r[pct] > b[pct] * (1 + threshold) and r[pct] - b[pct] > MIN_LATENCY_DELTA_MS:
+                    out.append(f"{name}: {label} {pct} {b[pct]:.2f} -> {r[pct]:.2f}")
+        for label, size in run.get("cookie_bytes", {}).items():
+            if size > base.get("cookie_bytes", {}).get(label, size):
+                out.append(f"{name}: cookie em {label} {base['cookie_bytes'][label]} -> {size} bytes")
+        base_rss = [v for v in base.get("rss_mb", {}).values() if v]
+        cur_rss = [v for v in run.get("rss_mb", {}).values() if v]
+        if base_rss and cur_rss and max(cur_rss) > max(base_rss) * (1 + threshold):
+            out.append(f"{name}: RSS máx {max(base_rss)} -> {max(cur_rss)} MB")
+    return out
+
+
+def print_regressions(regressions):
+    if not regressions:
+        print("sem regressões", file=sys.stderr)
+        return False
+    print(f"{len(regressions)} regressão(ões):", file=sys.stderr)
+    for line in regressions:
+        print(f"  - {line}", file=sys.stderr)
+    return True
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    return 1 if print_regressions(compare(baseline, current, args.threshold)) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do fluxo de quiz do LexQuiz.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="executa o cenário e grava o resultado")
+    run.add_argument("--target", choices=("client", "gunicorn"), default="client")
+    run.add_argument("--sizes", default="1000", help="tamanhos do banco, ex.: 1000,10000,100000")
+    run.add_argument("--users", type=int, default=40, help="usuários virtuais (um quiz completo cada)")
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--warmup", type=int, default=2, help="usuários antes da medição")
+    run.add_argument("--questions", type=int, default=10, help="questões por quiz (5 a 20)")
+    run.add_argument("--mode", default="treino", choices=("treino", "prova", "adaptativo"))
+    run.add_argument("--area", default=None, help="fixa a área (padrão: alterna entre as do banco)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--workers", type=int, default=2, help="workers do gunicorn")
+    run.add_argument("--threads", type=int, default=1, help="threads por worker do gunicorn")
+    run.add_argument("--no-preload", action="store_true", help="cada worker importa o app (LEXQUIZ_PRELOAD=off)")
+    run.add_argument("--boot-timeout", type=float, default=120.0)
+    run.add_argument("--out", default=None, help="arquivo JSON de saída")
+    run.add_argument("--baseline", default=None, help="compara com este resultado ao final")
+    run.add_argument("--threshold", type=float, default=0.15)
+    run.add_argument("--keep", action="store_true", help="mantém o diretório temporário")
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="aponta regressões em relação a um baseline")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.15, help="tolerância relativa (0.15 = 15%%)")
+    cmp_.set_defaults(func=cmd_compare)
+
+    if argv is None and len(sys.argv) > 2 and sys.argv[1] == "_client":
+        _client_child(json.loads(sys.argv[2]))
+        return 0
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+import math
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from db import LocalConnection
+
+# =========================================================
+# TURMAS: QUIZ FIXO POR CÓDIGO + PLACAR AO VIVO
+# =========================================================
+# O professor gera um código que fixa um snapshot do quiz (ids + ordem das
+# alternativas); todo aluno que entra com o código faz exatamente a mesma
+# prova. O resultado de cada aluno vai para classroom.sqlite3 com um número
+# de versão crescente por turma.
+#
+# Cada worker mantém o placar das turmas ativas numa skip list indexável
+# ordenada por (-acertos, tempo, id): inserir e consultar a posição custam
+# O(log n). A sincronização com o SQLite é incremental (só versões novas) e
+# no máximo a cada `sync_interval`, então o polling do placar quase nunca
+# toca o banco.
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # sem 0/O, 1/I
+CODE_LENGTH = 6
+NAME_MAX = 40
+
+
+def normalize_code(code):
+    return "".join(c for c in (code or "").upper() if c in CODE_ALPHABET)[:CODE_LENGTH]
+
+
+def clean_name(name):
+    return " ".join((name or "").split())[:NAME_MAX]
+
+
+# ---------- skip list indexável ----------
+class _Top:
+    """Sentinela maior que qualquer chave (fim de todos os níveis)."""
+
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+_NIL = _Node(_Top(), 0)
+
+
+class IndexableSkipList:
+    """
+    Chaves ordenadas com inserção, remoção, posição (`rank`) e fatia por
+    posição em O(log n). `width[l]` = quantas posições o ponteiro do nível l
+    pula, então a posição sai somando larguras na descida.
+    """
+
+    MAX_LEVELS = 24  # ~16 milhões de entradas
+
+    def __init__(self, rng=None):
+        self.size = 0
+        self._rng = rng or random.Random()
+        self.head = _Node(None, self.MAX_LEVELS)
+        self.head.next = [_NIL] * self.MAX_LEVELS
+
+    def __len__(self):
+        return self.size
+
+    def _levels(self):
+        return min(self.MAX_LEVELS, 1 - int(math.log(1.0 - self._rng.random(), 2.0)))
+
+    def insert(self, key):
+        chain = [None] * self.MAX_LEVELS
+        steps_at = [0] * self.MAX_LEVELS
+        node = self.head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level].key <= key:
+                steps_at[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        d = self._levels()
+        new = _Node(key, d)
+        steps = 0
+        for level in range(d):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at[level]
+        for level in range(d, self.MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain = [None] * self.MAX_LEVELS
+        node = self.head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is _NIL or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """Quantas chaves são menores que `key` (posição 0-based)."""
+        r = 0
+        node = self.head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level].key < key:
+                r += node.width[level]
+                node = node.next[level]
+        return r
+
+    def slice(self, start, count):
+        """Até `count` chaves a partir da posição `start`."""
+        if start >= self.size or count <= 0:
+            return []
+        i = start + 1
+        node = self.head
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.width[level] <= i and node.next[level] is not _NIL:
+                i -= node.width[level]
+                node = node.next[level]
+        out = []
+        while node is not _NIL and len(out) < count:
+            out.append(node.key)
+            node = node.next[0]
+        return out
+
+
+# ---------- placar ----------
+class Leaderboard:
+    """Placar de uma turma (por worker), alimentado pelas linhas novas do SQLite."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.synced_at = 0.0
+        self._order = IndexableSkipList()
+        self._keys = {}     # entrada -> chave na skip list
+        self._rows = {}     # entrada -> dados públicos
+        self._log = []      # (versão, entrada) em ordem de versão
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, entry):
+        return entry in self._keys
+
+    def apply(self, entry, name, score, n, elapsed_ms, version):
+        old = self._keys.get(entry)
+        if old is not None:
+            self._order.remove(old)
+        key = (-score, elapsed_ms, entry)
+        self._order.insert(key)
+        self._keys[entry] = key
+        self._rows[entry] = {"id": entry, "name": name, "score": score, "n": n, "time_ms": elapsed_ms}
+        self._log.append((version, entry))
+        self.version = max(self.version, version)
+
+    def rank(self, entry):
+        key = self._keys.get(entry)
+        return None if key is None else self._order.rank(key) + 1
+
+    def row(self, entry):
+        return dict(self._rows[entry], rank=self.rank(entry))
+
+    def top(self, k, start=0):
+        return [dict(self._rows[key[2]], rank=start + i + 1)
+                for i, key in enumerate(self._order.slice(start, k))]
+
+    def changes(self, since):
+        """Entradas alteradas depois da versão `since`, com a posição atual."""
+        lo, hi = 0, len(self._log)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._log[mid][0] <= since:
+                lo = mid + 1
+            else:
+                hi = mid
+        seen = set()
+        out = []
+        for _, entry in self._log[lo:]:
+            if entry not in seen:
+                seen.add(entry)
+                out.append(self.row(entry))
+        return out
+
+
+# ---------- persistência ----------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classes (
+    code TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    area TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    items BLOB NOT NULL,
+    perms BLOB NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    elapsed_ms INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    submitted REAL NOT NULL,
+    UNIQUE (code, uid)
+);
+CREATE INDEX IF NOT EXISTS results_version ON results (code, version);
+"""
+
+
+class ClassroomStore:
+    """
+    Turmas e resultados (SQLite em modo WAL, uma conexão por thread),
+    compartilhado entre os workers. Snapshots são imutáveis e ficam em cache;
+    placares são sincronizados de forma incremental.
+    """
+
+    def __init__(self, path: str, ttl: int = 60 * 60 * 24 * 30, sync_interval: float = 0.5,
+                 max_boards: int = 256):
+        self.path = path
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.max_boards = max_boards
+        self._conn = LocalConnection(path)
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        self._boards = OrderedDict()
+        self._conn().executescript(SCHEMA)
+
+    # ---------- turmas ----------
+    def create(self, title, area, mode, items: bytes, perms: bytes):
+        """Grava o snapshot e devolve o código (tenta de novo se colidir)."""
+        now = time.time()
+        for _ in range(10):
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            try:
+                self._conn().execute(
+                    "INSERT INTO classes (code, title, area, mode, items, perms, created, expires)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (code, title, area, mode, items, perms, now, now + self.ttl),
+                )
+                return code
+            except sqlite3.IntegrityError:
+                continue
+        raise RuntimeError("não foi possível gerar um código de turma livre")
+
+    def get(self, code):
+        """Snapshot {code, title, area, mode, items, perms} ou None."""
+        code = normalize_code(code)
+        with self._lock:
+            snap = self._snapshots.get(code)
+            if snap is not None:
+                self._snapshots.move_to_end(code)
+                return snap
+        row = self._conn().execute(
+            "SELECT title, area, mode, items, perms FROM classes WHERE code = ? AND expires >= ?",
+            (code, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        snap = {"code": code, "title": row[0], "area": row[1], "mode": row[2],
+                "items": bytes(row[3]), "perms": bytes(row[4])}
+        with self._lock:
+            self._snapshots[code] = snap
+            while len(self._snapshots) > 1024:
+                self._snapshots.popitem(last=False)
+        return snap
+
+    # ---------- resultados ----------
+    def submit(self, code, uid, name, score, n, elapsed_ms):
+        """
+        Registra o resultado (só a primeira entrega de cada aluno conta).
+        Retorna o id da entrada no placar.
+        """
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR IGNORE INTO results (code, uid, name, score, n, elapsed_ms, version, submitted)"
+            " VALUES (?, ?, ?, ?, ?, ?,"
+            " (SELECT COALESCE(MAX(version), 0) + 1 FROM results WHERE code = ?), ?)",
+            (code, uid, clean_name(name) or "Anônimo", score, n, int(elapsed_ms), code, time.time()),
+        )
+        self.board(code, force=True)
+        return self.entry_of(code, uid)
+
+    def entry_of(self, code, uid):
+        row = self._conn().execute(
+            "SELECT id FROM results WHERE code = ? AND uid = ?", (code, uid)
+        ).fetchone()
+        return row[0] if row else None
+
+    def board(self, code, force=False):
+        """Placar da turma, trazendo do banco só o que mudou desde a última sincronização."""
+        with self._lock:
+            board = self._boards.get(code)
+            if board is None:
+                board = self._boards[code] = Leaderboard()
+            self._boards.move_to_end(code)
+            while len(self._boards) > self.max_boards:
+                self._boards.popitem(last=False)
+
+        now = time.monotonic()
+        with board.lock:
+            if force or now - board.synced_at >= self.sync_interval:
+                rows = self._conn().execute(
+                    "SELECT id, name, score, n, elapsed_ms, version FROM results"
+                    " WHERE code = ? AND version > ? ORDER BY version",
+                    (code, board.version),
+                ).fetchall()
+                for row in rows:
+                    board.apply(*row)
+                board.synced_at = now
+        return board
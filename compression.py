@@ -0,0 +1,204 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:  # sem brotli, só gzip
+    brotli = None
+
+# =========================================================
+# COMPRESSÃO DE RESPOSTAS DINÂMICAS (WSGI)
+# =========================================================
+# Fica por dentro do WhiteNoise (que já serve .gz/.br prontos dos estáticos)
+# e comprime HTML/JSON do Flask. Respostas com Content-Length abaixo de
+# `min_size` passam direto; respostas em streaming (sem Content-Length) são
+# comprimidas pedaço a pedaço, sem juntar o corpo inteiro na memória.
+# Toda resposta de tipo comprimível leva `Vary: Accept-Encoding`, mesmo
+# quando sai sem compressão (cliente sem gzip/br, corpo pequeno): senão um
+# cache compartilhado entrega a versão de um cliente para o outro.
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+def with_vary(headers):
+    """Cabeçalhos com Accept-Encoding somado ao Vary (uma linha só)."""
+    vary = [v for k, v in headers if k.lower() == "vary"]
+    if any("accept-encoding" in v.lower() for v in vary):
+        return headers
+    out = [(k, v) for k, v in headers if k.lower() != "vary"]
+    out.append(("Vary", ", ".join(vary + ["Accept-Encoding"])))
+    return out
+
+
+def accepts(header, coding):
+    """True se `coding` aparece no Accept-Encoding com q > 0."""
+    for part in header.lower().split(","):
+        name, _, params = part.partition(";")
+        if name.strip() != coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        return q > 0
+    return False
+
+
+class _Encoder:
+    def __init__(self, coding, gzip_level, brotli_quality):
+        if coding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+            self.compress = self._c.process
+            self.flush = self._c.flush
+            self.finish = self._c.finish
+        else:
+            # wbits=31: cabeçalho/rodapé gzip
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self.compress = self._c.compress
+            self.flush = lambda: self._c.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self._c.flush
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli conforme Accept-Encoding.
+
+    Em streaming, junta até `chunk_size` bytes antes de cada flush para não
+    mandar um pacote por pedacinho do Jinja; o primeiro flush sai já com
+    `first_flush` bytes (o <head> chega cedo e o navegador busca o CSS).
+    """
+
+    def __init__(self, wsgi_app, min_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, chunk_size: int = 8192, first_flush: int = 1024):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.chunk_size = chunk_size
+        self.first_flush = first_flush
+
+    def _negotiate(self, environ):
+        accept = environ.get("HTTP_ACCEPT_ENCODING", "")
+        if not accept or environ.get("REQUEST_METHOD") == "HEAD":
+            return None
+        if brotli is not None and accepts(accept, "br"):
+            return "br"
+        if accepts(accept, "gzip"):
+            return "gzip"
+        return None
+
+    @staticmethod
+    def _eligible(headers):
+        """(o tipo pode ser comprimido por nós?, Content-Length ou None)."""
+        length = None
+        ctype = ""
+        for k, v in headers:
+            k = k.lower()
+            if k == "content-encoding":
+                return False, None
+            if k == "cache-control" and "no-transform" in v:
+                return False, None
+            if k == "content-length":
+                length = int(v)
+            elif k == "content-type":
+                ctype = v.split(";", 1)[0].strip().lower()
+        return ctype in COMPRESSIBLE_TYPES, length
+
+    def _should_compress(self, status, length):
+        if status[:3] in ("204", "206", "304") or not status.startswith(("2", "4", "5")):
+            return False
+        return length is None or length >= self.min_size
+
+    def __call__(self, environ, start_response):
+        coding = self._negotiate(environ)
+        state = {"coding": None, "started": False}
+
+        def _start_response(status, headers, exc_info=None):
+            state["started"] = True
+            state["coding"] = None
+            eligible, length = self._eligible(headers)
+            if not eligible:
+                return start_response(status, headers, exc_info)
+            headers = with_vary(headers)
+            if coding is not None and self._should_compress(status, length):
+                state["coding"] = coding
+                out = []
+                for k, v in headers:
+                    lk = k.lower()
+                    if lk == "content-length":
+                        continue
+                    if lk == "etag" and not v.startswith("W/"):
+                        # mesma representação lógica, bytes diferentes: ETag fraco
+                        v = "W/" + v
+                    out.append((k, v))
+                out.append(("Content-Encoding", coding))
+                headers = out
+            return start_response(status, headers, exc_info)
+
+        body = self.wsgi_app(environ, _start_response)
+        if state["started"] and state["coding"] is None:
+            # já sabemos que não comprime: devolve o corpo original (mantém file_wrapper)
+            return body
+        return _CompressedBody(body, state, self)
+
+
+class _CompressedBody:
+    def __init__(self, body, state, mw):
+        self._body = body
+        self._state = state
+        self._mw = mw
+
+    def __iter__(self):
+        it = iter(self._body)
+        # start_response pode vir só no primeiro pedaço: decide depois dele
+        try:
+            first = next(it)
+        except StopIteration:
+            first = None
+        coding = self._state["coding"]
+        if coding is None:
+            if first is not None:
+                yield first
+            yield from it
+            return
+
+        enc = _Encoder(coding, self._mw.gzip_level, self._mw.brotli_quality)
+        size = self._mw.first_flush
+        pending = []
+        pending_len = 0
+        chunks = it if first is None else _prepend(first, it)
+        for chunk in chunks:
+            if not chunk:
+                continue
+            pending.append(chunk)
+            pending_len += len(chunk)
+            if pending_len >= size:
+                data = enc.compress(b"".join(pending)) + enc.flush()
+                pending, pending_len = [], 0
+                size = self._mw.chunk_size
+                if data:
+                    yield data
+        tail = enc.compress(b"".join(pending)) if pending else b""
+        yield tail + enc.finish()
+
+    def close(self):
+        close = getattr(self._body, "close", None)
+        if close:
+            close()
+
+
+def _prepend(first, it):
+    yield first
+    yield from it
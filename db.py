@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import threading
+
+# =========================================================
+# CONEXÕES SQLITE (WAL) COMPARTILHADAS PELOS STORES
+# =========================================================
+# Todos os arquivos em instance/*.sqlite3 são abertos do mesmo jeito: WAL
+# (leitores não esperam o escritor), synchronous=NORMAL e timeout de 10 s
+# para a trava de escrita disputada entre os workers do gunicorn.
+
+
+def connect(path: str, **kwargs):
+    """Conexão nova em modo WAL; `kwargs` vão para sqlite3.connect."""
+    conn = sqlite3.connect(path, timeout=10, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class LocalConnection:
+    """
+    `conn = LocalConnection(path)`; `conn()` devolve a conexão desta thread,
+    em autocommit (isolation_level=None), aberta na primeira chamada.
+
+    A conexão é reaberta quando o pid muda: a que foi aberta no master
+    (gunicorn --preload) não serve no worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def __call__(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = connect(self.path, isolation_level=None)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import sqlite3
+from datetime import datetime, time as dtime, timedelta, timezone
+
+from question_store import norm_area
+
+# =========================================================
+# EXPORTAÇÃO (CSV / JSONL) DO HISTÓRICO DE TENTATIVAS
+# =========================================================
+# Tudo é gerador: as linhas saem do SQLite em lotes de `batch` por chave
+# (id > último id visto / qid > último qid), cada lote numa consulta curta.
+# Memória constante para milhões de linhas, e nenhuma transação de leitura
+# fica aberta enquanto o cliente baixa devagar (o WAL continua fazendo
+# checkpoint e os workers que gravam não esperam).
+#
+# Retomada: cada linha traz o id (tentativas) ou o qid (questões); uma
+# exportação interrompida continua com after=<último valor recebido>.
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+BATCH = 2000
+
+ATTEMPT_COLUMNS = ("id", "ts", "time", "user_key", "qid", "area", "chosen", "correct", "latency_ms", "mode")
+QUESTION_COLUMNS = (
+    "qid", "area", "difficulty", "cluster_id", "attempts", "correct", "p_value",
+    "avg_latency_ms", "users", "first_ts", "last_ts",
+)
+
+
+class ExportError(ValueError):
+    """Parâmetro de exportação inválido (vira 400 na rota / erro no CLI)."""
+
+
+def parse_when(value, end=False):
+    """
+    "2026-03-01", "2026-03-01T12:00" ou epoch -> epoch (UTC). Data sem hora
+    com `end=True` vale até o fim do dia. None/"" -> None.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"data inválida: {value!r}")
+    if len(value) == 10 and end:
+        dt = datetime.combine(dt.date(), dtime()) + timedelta(days=1)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds") if ts is not None else None
+
+
+def _where(since, until, user):
+    clauses, args = [], []
+    if since is not None:
+        clauses.append("ts >= ?")
+        args.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        args.append(until)
+    if user:
+        clauses.append("user_key = ?")
+        args.append(user)
+    return clauses, args
+
+
+def _connect(path):
+    # só leitura: a exportação nunca disputa a escrita com o AttemptLog
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+def iter_attempts(path, area_of, area=None, since=None, until=None, user=None,
+                  after=0, limit=None, batch=BATCH):
+    """Dicts na ordem de ATTEMPT_COLUMNS, por id crescente."""
+    clauses, args = _where(since, until, user)
+    sql = (
+        "SELECT id, ts, user_key, qid, chosen, correct, latency_ms, mode FROM attempts"
+        f" WHERE {' AND '.join(['id > ?'] + clauses)} ORDER BY id LIMIT ?"
+    )
+    sent = 0
+    conn = _connect(path)
+    try:
+        while limit is None or sent < limit:
+            rows = conn.execute(sql, [after, *args, batch]).fetchall()
+            if not rows:
+                return
+            after = rows[-1][0]
+            for rid, ts, user_key, qid, chosen, correct, latency_ms, mode in rows:
+                q_area = area_of(qid)
+                if area and q_area != area:
+                    continue
+                yield {
+                    "id": rid, "ts": round(ts, 3), "time": _iso(ts), "user_key": user_key,
+                    "qid": qid, "area": q_area, "chosen": chosen, "correct": correct,
+                    "latency_ms": latency_ms, "mode": mode,
+                }
+                sent += 1
+                if limit is not None and sent >= limit:
+                    return
+    finally:
+        conn.close()
+
+
+def iter_question_stats(path, question_of, cluster_of, area=None, since=None, until=None,
+                        user=None, after=0, limit=None, batch=BATCH):
+    """
+    Agregado por questão das tentativas filtradas, por qid crescente. O
+    GROUP BY percorre o índice de qid, então cada lote para em `batch` grupos.
+    """
+    clauses, args = _where(since, until, user)
+    sql = (
+        "SELECT qid, COUNT(*), SUM(correct), AVG(latency_ms), COUNT(DISTINCT user_key), MIN(ts), MAX(ts)"
+        f" FROM attempts WHERE {' AND '.join(['qid > ?'] + clauses)}"
+        " GROUP BY qid ORDER BY qid LIMIT ?"
+    )
+    sent = 0
+    conn = _connect(path)
+    try:
+        while limit is None or sent < limit:
+            rows = conn.execute(sql, [after, *args, batch]).fetchall()
+            if not rows:
+                return
+            after = rows[-1][0]
+            for qid, attempts, correct, avg_ms, users, first_ts, last_ts in rows:
+                q = question_of(qid) or {}
+                q_area = q.get("area")
+                if area and norm_area(q_area) != area:
+                    continue
+                yield {
+                    "qid": qid, "area": q_area, "difficulty": q.get("difficulty"),
+                    "cluster_id": cluster_of(qid), "attempts": attempts, "correct": correct,
+                    "p_value": round(correct / attempts, 4) if attempts else None,
+                    "avg_latency_ms": round(avg_ms) if avg_ms is not None else None,
+                    "users": users, "first_ts": _iso(first_ts), "last_ts": _iso(last_ts),
+                }
+                sent += 1
+                if limit is not None and sent >= limit:
+                    return
+    finally:
+        conn.close()
+
+
+def encode(rows, columns, fmt, chunk_size=64 * 1024):
+    """
+    Linhas -> pedaços de bytes (~`chunk_size`) em CSV (com cabeçalho) ou
+    JSONL. Junta várias linhas por pedaço para não mandar um write por linha.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"formato inválido: {fmt!r} (use {', '.join(FORMATS)})")
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(columns)
+        write = lambda row: writer.writerow([row[c] for c in columns])
+    else:
+        write = lambda row: buf.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+    for row in rows:
+        write(row)
+        if buf.tell() >= chunk_size:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+from metrics import format_memory, memory_usage
+
+# =========================================================
+# GUNICORN (lido automaticamente por `gunicorn app:app`)
+# =========================================================
+# Com preload o master importa o app, carrega/indexa/congela o banco uma vez
+# e os workers nascem por fork dividindo essa memória (copy-on-write).
+# LEXQUIZ_PRELOAD=off volta ao comportamento antigo (cada worker importa).
+# Workers: WEB_CONCURRENCY (padrão do gunicorn) ou --workers.
+
+preload_app = os.environ.get("LEXQUIZ_PRELOAD", "on").strip().lower() not in ("0", "off", "false")
+
+_started = time.perf_counter()
+
+
+def _boot_report():
+    module = sys.modules.get("app")
+    return getattr(module, "BOOT_REPORT", None) or {}
+
+
+def when_ready(server):
+    report = _boot_report()
+    if report:
+        server.log.info(
+            "LexQuiz: %d questões, banco em %.3fs, master pronto em %.3fs (%s)",
+            report["questions"], report["bank_seconds"], time.perf_counter() - _started,
+            format_memory(memory_usage()),
+        )
+    else:
+        server.log.info("LexQuiz: master pronto em %.3fs (sem preload)", time.perf_counter() - _started)
+
+
+def post_worker_init(worker):
+    # sem preload, o boot acontece aqui no worker
+    report = _boot_report()
+    worker.log.info(
+        "LexQuiz worker %s: %s%s",
+        worker.pid, format_memory(memory_usage()),
+        "" if preload_app else f" (banco em {report.get('bank_seconds', 0):.3f}s)",
+    )
@@ -0,0 +1,353 @@
+import logging
+import math
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local, 1 processo)
+    fcntl = None
+
+# =========================================================
+# ANÁLISE DE ITENS (CONTADORES COMPARTILHADOS ENTRE WORKERS)
+# =========================================================
+# Cada questão ocupa um slot fixo num arquivo mapeado em memória (mmap),
+# localizado por hash aberto do id. Todos os workers do gunicorn mapeiam o
+# mesmo arquivo; cada atualização trava só o próprio slot (fcntl.lockf por
+# faixa de bytes), então workers diferentes raramente se esperam.
+#
+# slot: qid, tentativas, acertos, escolhas[8] (0 = sem resposta, 1..7 = A..G),
+#       n1/n0 = respostas certas/erradas com escore do restante do quiz,
+#       sum1/sum0 = soma desses escores, sumsq = soma dos quadrados (todos).
+#
+# Capacidade: `reserve` deixa a tabela com >= 2 slots por questão do banco
+# (carga <= 0.5, sondagens curtas). Crescer reescreve o arquivo, então só
+# acontece na carga inicial, antes de os workers atenderem; num reload que
+# passe do limite, o log avisa para reiniciar. A sondagem para em
+# MAX_PROBE slots: tabela lotada não conta a questão nova e registra o erro
+# em vez de varrer o arquivo inteiro a cada /answer.
+
+MAGIC = b"LXIS"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sII")            # magic, versão, capacidade
+SLOT = struct.Struct("<III8IIIddd4x")
+MAX_PICKS = 8
+
+# limiares clássicos
+EASY_P = 0.90
+HARD_P = 0.20
+LOW_DISCRIMINATION = 0.20
+FUNCTIONAL_DISTRACTOR = 0.05
+MIN_ATTEMPTS = 20
+
+MAX_PROBE = 256
+
+log = logging.getLogger("lexquiz.item_stats")
+
+
+def _next_pow2(n):
+    return 1 << max(4, (n - 1).bit_length())
+
+
+def discrimination(row):
+    """Ponto-bisserial (M1 - M0) / s * sqrt(p q) de um slot; None sem dados."""
+    n1, n0, sum1, sum0, sumsq = row[11], row[12], row[13], row[14], row[15]
+    if not (n1 and n0):
+        return None
+    n = n1 + n0
+    mean = (sum1 + sum0) / n
+    var = sumsq / n - mean * mean
+    if var <= 1e-12:
+        return None
+    pp = n1 / n
+    return (sum1 / n1 - sum0 / n0) / math.sqrt(var) * math.sqrt(pp * (1 - pp))
+
+
+class ItemStats:
+    """
+    Contadores por questão + estatística clássica de itens.
+
+    `record_answer` roda em todo /answer; `record_quiz` no fim do quiz
+    (escore do restante, para a correlação ponto-bisserial).
+    """
+
+    def __init__(self, path: str, capacity: int = 65536, snapshot_interval: float = 300.0):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.full = 0  # questões que não couberam na tabela
+        # lockf é por processo: as threads do mesmo worker usam estas travas
+        self._stripes = [threading.Lock() for _ in range(64)]
+        self._next_snapshot = time.time() + snapshot_interval
+        self._snapshot_thread = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._open(_next_pow2(capacity))
+
+    def _open(self, capacity):
+        size = HEADER.size + capacity * SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._lock_range(fd, 0, HEADER.size)
+            try:
+                if os.fstat(fd).st_size < HEADER.size:
+                    os.ftruncate(fd, size)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, HEADER.pack(MAGIC, FORMAT_VERSION, capacity))
+                os.lseek(fd, 0, os.SEEK_SET)
+                magic, version, cap = HEADER.unpack(os.read(fd, HEADER.size))
+                if magic != MAGIC or version != FORMAT_VERSION:
+                    raise ValueError(f"{self.path}: arquivo de estatísticas incompatível")
+                size = HEADER.size + cap * SLOT.size
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                self._unlock_range(fd, 0, HEADER.size)
+            self.capacity = cap
+            self._fd = fd
+            self._mm = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+
+    def reserve(self, n_items: int, grow: bool = True):
+        """
+        Garante capacidade para `n_items` questões com carga <= 0.5. Com
+        `grow=False` (workers já atendendo) só registra o erro se não couber.
+        """
+        need = _next_pow2(2 * n_items)
+        if need <= self.capacity:
+            return True
+        if not grow:
+            log.error("item_stats: %d questões pedem %d slots e a tabela tem %d; "
+                      "reinicie o servidor (ou aumente LEXQUIZ_STATS_CAPACITY)",
+                      n_items, need, self.capacity)
+            return False
+        # os workers que sobem juntos (sem --preload) fazem isto em fila: o
+        # primeiro reescreve o arquivo, os outros só reabrem o novo
+        with open(f"{self.path}.lock", "a+") as lock:
+            if fcntl is not None:
+                fcntl.lockf(lock, fcntl.LOCK_EX)
+            self._reopen(self.capacity)
+            if need > self.capacity:
+                tmp = f"{self.path}.{os.getpid()}.grow"
+                bigger = ItemStats(tmp, capacity=need, snapshot_interval=self.snapshot_interval)
+                try:
+                    for row in self.iter_rows():
+                        i = bigger._find(row[0], create=True)
+                        SLOT.pack_into(bigger._mm, bigger._offset(i), *row)
+                finally:
+                    bigger.close()
+                os.replace(tmp, self.path)
+                log.info("item_stats: tabela ampliada de %d para %d slots", self.capacity, need)
+                self._reopen(need)
+        return True
+
+    def _reopen(self, capacity):
+        self._mm.close()
+        os.close(self._fd)
+        self._open(capacity)
+
+    # ---------- travas por faixa ----------
+    def _lock_range(self, fd, offset, length):
+        self._stripes[(offset // SLOT.size) % len(self._stripes)].acquire()
+        if fcntl is not None:
+            fcntl.lockf(fd, fcntl.LOCK_EX, length, offset)
+
+    def _unlock_range(self, fd, offset, length):
+        if fcntl is not None:
+            fcntl.lockf(fd, fcntl.LOCK_UN, length, offset)
+        self._stripes[(offset // SLOT.size) % len(self._stripes)].release()
+
+    def _offset(self, i):
+        return HEADER.size + i * SLOT.size
+
+    def _find(self, qid, create):
+        """Índice do slot da questão (sondagem linear); None se não existe/cheio."""
+        mask = self.capacity - 1
+        i = (qid * 2654435761) & mask
+        for _ in range(min(self.capacity, MAX_PROBE)):
+            off = self._offset(i)
+            cur = struct.unpack_from("<I", self._mm, off)[0]
+            if cur == qid:
+                return i
+            if cur == 0:
+                if not create:
+                    return None
+                self._lock_range(self._fd, off, SLOT.size)
+                try:
+                    cur = struct.unpack_from("<I", self._mm, off)[0]
+                    if cur == 0:
+                        struct.pack_into("<I", self._mm, off, qid)
+                        return i
+                finally:
+                    self._unlock_range(self._fd, off, SLOT.size)
+                if cur == qid:
+                    return i
+            i = (i + 1) & mask
+        return None
+
+    def _update(self, qid, fn):
+        i = self._find(qid, create=True)
+        if i is None:
+            self.full += 1
+            if self.full == 1:
+                log.error("item_stats: tabela cheia (%d slots), questão %d não foi contada",
+                          self.capacity, qid)
+            return
+        off = self._offset(i)
+        self._lock_range(self._fd, off, SLOT.size)
+        try:
+            row = list(SLOT.unpack_from(self._mm, off))
+            fn(row)
+            SLOT.pack_into(self._mm, off, *row)
+        finally:
+            self._unlock_range(self._fd, off, SLOT.size)
+        self._maybe_snapshot()
+
+    # ---------- escrita ----------
+    def record_answer(self, qid, chosen: int, is_correct: bool):
+        def fn(row):
+            row[1] += 1
+            if is_correct:
+                row[2] += 1
+            k = chosen + 1 if 0 <= chosen < MAX_PICKS - 1 else 0
+            row[3 + k] += 1
+        self._update(qid, fn)
+
+    def record_quiz(self, results):
+        """
+        `results` = [(qid, acertou), ...] de um quiz terminado.
+
+        Usa o escore do restante do quiz (sem a própria questão), que é o
+        critério da correlação ponto-bisserial corrigida.
+        """
+        n = len(results)
+        if n < 2:
+            return
+        total = sum(1 for _, hit in results if hit)
+        for qid, hit in results:
+            rest = (total - (1 if hit else 0)) / (n - 1)
+
+            def fn(row, hit=hit, rest=rest):
+                if hit:
+                    row[11] += 1
+                    row[13] += rest
+                else:
+                    row[12] += 1
+                    row[14] += rest
+                row[15] += rest * rest
+            self._update(qid, fn)
+
+    # ---------- leitura ----------
+    def raw(self, qid):
+        i = self._find(qid, create=False)
+        if i is None:
+            return None
+        return SLOT.unpack_from(self._mm, self._offset(i))
+
+    def counts(self, qid):
+        """(tentativas, erros) — usado pelo quiz adaptativo."""
+        row = self.raw(qid)
+        if row is None:
+            return 0, 0
+        return row[1], row[1] - row[2]
+
+    def iter_rows(self):
+        for i in range(self.capacity):
+            off = self._offset(i)
+            if struct.unpack_from("<I", self._mm, off)[0]:
+                yield SLOT.unpack_from(self._mm, off)
+
+    def item_report(self, row, n_options=None, answer=None):
+        qid, attempts, correct = row[0], row[1], row[2]
+        picks = list(row[3:3 + MAX_PICKS])
+        p = correct / attempts if attempts else None
+        r_pb = discrimination(row)
+
+        option_picks = picks[1:1 + n_options] if n_options else picks[1:]
+
+        # eficiência dos distratores: fração escolhida por >= 5% dos respondentes
+        de = None
+        distractors = [c for i, c in enumerate(option_picks) if i != answer]
+        if attempts and answer is not None and distractors:
+            functional = sum(1 for c in distractors if c >= FUNCTIONAL_DISTRACTOR * attempts)
+            de = functional / len(distractors)
+
+        return {
+            "id": qid,
+            "attempts": attempts,
+            "correct": correct,
+            "p_value": p,
+            "point_biserial": r_pb,
+            "distractor_efficiency": de,
+            "picks": option_picks,
+            "no_answer": picks[0],
+        }
+
+    def flags(self, report, answer):
+        out = []
+        if report["attempts"] < MIN_ATTEMPTS:
+            return out
+        p = report["p_value"]
+        if p is not None and p > EASY_P:
+            out.append("too_easy")
+        if p is not None and p < HARD_P:
+            out.append("too_hard")
+        r = report["point_biserial"]
+        if r is not None and r < LOW_DISCRIMINATION:
+            out.append("low_discrimination")
+        de = report["distractor_efficiency"]
+        if de is not None and de < 1.0:
+            out.append("weak_distractors")
+        distractors = [c for i, c in enumerate(report["picks"]) if i != answer]
+        if distractors and 0 <= answer < len(report["picks"]) and max(distractors) > report["picks"][answer]:
+            out.append("misleading_distractor")
+        return out
+
+    # ---------- snapshot ----------
+    def _maybe_snapshot(self):
+        # a cópia roda numa thread, fora do request
+        now = time.time()
+        if now < self._next_snapshot:
+            return
+        self._next_snapshot = now + self.snapshot_interval
+        thread = self._snapshot_thread
+        if thread is not None and thread.is_alive():
+            return
+        self._snapshot_thread = threading.Thread(
+            target=self._snapshot_once, name="item-stats-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def _snapshot_once(self):
+        """Um worker por intervalo: quem pega a trava e acha a cópia velha copia."""
+        with open(f"{self.path}.lock", "a+") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.lockf(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return  # outro worker está copiando
+            try:
+                age = time.time() - os.path.getmtime(f"{self.path}.snap")
+            except OSError:
+                age = None
+            if age is None or age >= self.snapshot_interval * 0.9:
+                self.snapshot()
+
+    def snapshot(self):
+        """msync do mmap + cópia atômica em `<arquivo>.snap`."""
+        self._mm.flush()
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        shutil.copyfile(self.path, tmp)
+        os.replace(tmp, f"{self.path}.snap")
+
+    def close(self):
+        try:
+            self._mm.flush()
+            self._mm.close()
+        finally:
+            os.close(self._fd)
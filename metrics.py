@@ -0,0 +1,428 @@
+import atexit
+import cProfile
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import request, before_render_template, template_rendered
+
+# =========================================================
+# MÉTRICAS (FORMATO PROMETHEUS) + PROFILER POR AMOSTRAGEM
+# =========================================================
+# Cada worker acumula contadores/histogramas em memória e, a cada
+# `flush_interval` segundos, grava um JSON com o seu pid num diretório
+# comum (instance/metrics). O /metrics de qualquer worker soma os arquivos
+# de todos, então o Prometheus vê o serviço inteiro com um só scrape.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "lexquiz_http_request_duration_seconds": ("histogram", "Latência por endpoint (inclui o envio do corpo)."),
+    "lexquiz_http_requests_total": ("counter", "Requests por endpoint e status."),
+    "lexquiz_template_render_seconds": ("histogram", "Tempo de renderização por template."),
+    "lexquiz_session_seconds": ("histogram", "Carga (open) e serialização/assinatura/gravação (save) da sessão."),
+    "lexquiz_quiz_started_total": ("counter", "Quizzes iniciados por área e modo."),
+    "lexquiz_quiz_completed_total": ("counter", "Quizzes concluídos por área e modo."),
+    "lexquiz_offline_answers_total": ("counter", "Respostas feitas offline recebidas em lote."),
+    "lexquiz_bank_questions": ("gauge", "Questões no banco carregado."),
+    "lexquiz_process_resident_memory_bytes": ("gauge", "RSS de cada worker."),
+    "lexquiz_profiles_total": ("counter", "Requests perfilados pelo profiler por amostragem."),
+    "lexquiz_boot_seconds": ("gauge", "Tempo de carga e indexação do banco no boot."),
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def memory_usage(pid="self"):
+    """
+    {"rss", "pss", "private", "shared"} em bytes (Linux, smaps_rollup).
+
+    Com vários workers, `pss` é a fatia justa de cada um e `private` o que
+    o worker não divide com ninguém (o que realmente custa por worker).
+    """
+    out = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                parts = rest.split()
+                if len(parts) == 2 and parts[1] == "kB":
+                    out[key] = int(parts[0]) * 1024
+    except OSError:
+        rss = _rss_bytes() if pid == "self" else None
+        return {"rss": rss} if rss is not None else {}
+    return {
+        "rss": out.get("Rss"),
+        "pss": out.get("Pss"),
+        "private": out.get("Private_Clean", 0) + out.get("Private_Dirty", 0),
+        "shared": out.get("Shared_Clean", 0) + out.get("Shared_Dirty", 0),
+    }
+
+
+def format_memory(mem):
+    return " ".join(f"{k}={v / 1048576:.1f}MB" for k, v in mem.items() if v is not None) or "n/d"
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class Metrics:
+    """Registro por processo; `render()` soma os de todos os workers."""
+
+    def __init__(self, directory: str, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._counters = {}     # (nome, labels) -> valor
+        self._hists = {}        # (nome, labels) -> [contagem por bucket..., +Inf, soma]
+        self._gauges = {}       # (nome, labels) -> valor (por processo)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        # o filho do fork (gunicorn --preload) começa zerado; gauges ficam
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._hists = {}
+        self._thread = None
+        self._pid = None
+
+    # ---------- registro ----------
+    def inc(self, name, labels=None, value=1):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+        self._ensure_flusher()
+
+    def observe(self, name, seconds, labels=None):
+        key = _key(name, labels)
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+                    break
+            else:
+                h[len(LATENCY_BUCKETS)] += 1
+            h[-1] += seconds
+            self._dirty = True
+        self._ensure_flusher()
+
+    def set_gauge(self, name, value, labels=None):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+            self._dirty = True
+
+    # ---------- arquivo por worker ----------
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def _ensure_flusher(self):
+        # mesma ideia do AttemptLog: uma thread por processo (não sobrevive ao fork)
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            if self._dirty:
+                self.flush()
+
+    def _dump(self):
+        with self._lock:
+            self._dirty = False
+            return {
+                "counters": [[n, list(map(list, l)), v] for (n, l), v in self._counters.items()],
+                "hists": [[n, list(map(list, l)), list(h)] for (n, l), h in self._hists.items()],
+                "gauges": [[n, list(map(list, l)), v] for (n, l), v in self._gauges.items()],
+            }
+
+    def flush(self):
+        rss = _rss_bytes()
+        if rss is not None:
+            self.set_gauge("lexquiz_process_resident_memory_bytes", rss, {"pid": str(os.getpid())})
+        path = self._path(os.getpid())
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._dump(), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    # ---------- agregação ----------
+    def collect(self):
+        """(counters, hists, gauges) somados entre os workers."""
+        self.flush()
+        counters, hists, gauges = {}, {}, {}
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                pid = int(os.path.basename(path)[:-5])
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for n, l, v in data.get("counters", ()):
+                key = (n, tuple(map(tuple, l)))
+                counters[key] = counters.get(key, 0) + v
+            for n, l, h in data.get("hists", ()):
+                key = (n, tuple(map(tuple, l)))
+                acc = hists.get(key)
+                hists[key] = list(h) if acc is None else [a + b for a, b in zip(acc, h)]
+            # contadores de workers mortos continuam valendo; gauges não
+            if pid == os.getpid() or _alive(pid):
+                for n, l, v in data.get("gauges", ()):
+                    key = (n, tuple(map(tuple, l)))
+                    gauges[key] = max(gauges.get(key, v), v)
+        return counters, hists, gauges
+
+    def render(self):
+        counters, hists, gauges = self.collect()
+        by_name = {}
+        for (n, l), v in counters.items():
+            by_name.setdefault(n, []).append(("", l, v))
+        for (n, l), v in gauges.items():
+            by_name.setdefault(n, []).append(("", l, v))
+        for (n, l), h in hists.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), h[:-1]):
+                cumulative += count
+                by_name.setdefault(n, []).append(("_bucket", l + (("le", str(bound)),), cumulative))
+            by_name[n].append(("_sum", l, round(h[-1], 6)))
+            by_name[n].append(("_count", l, cumulative))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, text = HELP.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in by_name[name]:
+                lines.append(f"{name}{suffix}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+# =========================================================
+# PROFILER POR AMOSTRAGEM
+# =========================================================
+class SamplingProfiler:
+    """
+    Perfila 1 a cada `every` requests (por worker) com cProfile e grava o
+    .pstats em `directory` (abre com `python -m pstats` ou snakeviz/
+    flameprof). Mantém só os `keep` arquivos mais recentes.
+    """
+
+    def __init__(self, every: int, directory: str, keep: int = 50):
+        self.every = every
+        self.directory = directory
+        self.keep = keep
+        self._count = 0
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def should_sample(self):
+        with self._lock:
+            self._count += 1
+            hit = self._count % self.every == 0
+        # cProfile é por thread e não aninha: um perfil por vez no worker
+        return hit and self._busy.acquire(blocking=False)
+
+    def run(self, wsgi_app, environ, start_response):
+        """Executa o request inteiro (inclusive o corpo) sob o profiler."""
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            try:
+                body = wsgi_app(environ, start_response)
+                try:
+                    chunks = list(body)
+                finally:
+                    close = getattr(body, "close", None)
+                    if close:
+                        close()
+            finally:
+                prof.disable()
+            self._dump(prof, environ)
+            return chunks
+        finally:
+            self._busy.release()
+
+    def _dump(self, prof, environ):
+        endpoint = environ.get("lexquiz.endpoint") or "unmatched"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{endpoint.replace('.', '_')}.pstats"
+        try:
+            prof.dump_stats(os.path.join(self.directory, name))
+            files = sorted(glob.glob(os.path.join(self.directory, "*.pstats")), key=os.path.getmtime)
+            for old in files[:-self.keep]:
+                os.remove(old)
+        except OSError:
+            pass
+
+
+# =========================================================
+# INSTRUMENTAÇÃO DO APP
+# =========================================================
+class _ClosingIterator:
+    """Repassa o corpo e chama `on_close` (uma vez) ao fim do envio ou no close()."""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._body
+        self._finish()
+
+    def _finish(self):
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    def close(self):
+        try:
+            close = getattr(self._body, "close", None)
+            if close:
+                close()
+        finally:
+            self._finish()
+
+
+class MetricsMiddleware:
+    """WSGI: latência por endpoint (o endpoint vem do before_request do Flask)."""
+
+    def __init__(self, wsgi_app, metrics, profiler=None):
+        self.wsgi_app = wsgi_app
+        self.metrics = metrics
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        t0 = time.perf_counter()
+        status = []
+
+        def _start_response(s, headers, exc_info=None):
+            status[:] = [s[:3]]
+            return start_response(s, headers, exc_info)
+
+        def done():
+            endpoint = environ.get("lexquiz.endpoint") or "unmatched"
+            code = status[0] if status else "500"
+            self.metrics.observe(
+                "lexquiz_http_request_duration_seconds", time.perf_counter() - t0, {"endpoint": endpoint}
+            )
+            self.metrics.inc("lexquiz_http_requests_total", {"endpoint": endpoint, "status": code})
+
+        if self.profiler is not None and self.profiler.should_sample():
+            try:
+                chunks = self.profiler.run(self.wsgi_app, environ, _start_response)
+            finally:
+                self.metrics.inc("lexquiz_profiles_total")
+                done()
+            return chunks
+
+        try:
+            body = self.wsgi_app(environ, _start_response)
+        except Exception:
+            done()
+            raise
+        return _ClosingIterator(body, done)
+
+
+class TimedSessionInterface:
+    """Mede open/save da interface de sessão que estiver em uso; o resto é repassado."""
+
+    def __init__(self, inner, metrics):
+        self._inner = inner
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def open_session(self, app, req):
+        t0 = time.perf_counter()
+        try:
+            return self._inner.open_session(app, req)
+        finally:
+            self._metrics.observe("lexquiz_session_seconds", time.perf_counter() - t0, {"op": "open"})
+
+    def save_session(self, app, session, response):
+        t0 = time.perf_counter()
+        try:
+            return self._inner.save_session(app, session, response)
+        finally:
+            self._metrics.observe("lexquiz_session_seconds", time.perf_counter() - t0, {"op": "save"})
+
+
+def instrument(app, metrics, profiler=None):
+    """Liga middleware, sinais de template e timing de sessão no app."""
+    renders = threading.local()
+
+    @app.before_request
+    def _tag_endpoint():
+        request.environ["lexquiz.endpoint"] = request.endpoint or "unmatched"
+
+    def _before_render(sender, template, context, **extra):
+        stack = getattr(renders, "stack", None)
+        if stack is None:
+            stack = renders.stack = []
+        stack.append(time.perf_counter())
+
+    def _rendered(sender, template, context, **extra):
+        stack = getattr(renders, "stack", None)
+        if stack:
+            metrics.observe(
+                "lexquiz_template_render_seconds", time.perf_counter() - stack.pop(),
+                {"template": template.name or "?"},
+            )
+
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_rendered, app, weak=False)
+
+    app.session_interface = TimedSessionInterface(app.session_interface, metrics)
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app, metrics, profiler)
@@ -0,0 +1,185 @@
+import re
+import unicodedata
+import zlib
+
+# =========================================================
+# QUESTÕES QUASE IGUAIS (MINHASH + LSH)
+# =========================================================
+# Montado junto com o catálogo. Cada questão vira um conjunto de shingles:
+# pares de palavras do enunciado (sem acento, caixa e marcações entre
+# parênteses no começo/fim como "(Revisão)" ou "(marque a correta)") mais o
+# texto de cada alternativa, sem ordem. Então variações de prefixo, sufixo e
+# ordem das alternativas caem na mesma chave e são agrupadas sem custo.
+#
+# O resto passa por MinHash de uma permutação só (um crc32 por shingle,
+# NUM_BINS compartimentos, densificação por rotação) e LSH em faixas; os
+# pares candidatos são confirmados pelo Jaccard exato dos shingles.
+# Só questões da mesma área são comparadas.
+#
+# cluster_id = menor id do grupo, então é o mesmo em todos os workers e
+# sobrevive a reloads enquanto o grupo não muda. Questão sem duplicata é o
+# próprio cluster.
+
+SIMILARITY = 0.7
+SHINGLE = 2
+NUM_BINS = 64
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+# baldes muito cheios (alternativas genéricas iguais): compara só com os primeiros
+MAX_BUCKET = 64
+
+_DECOR_RE = re.compile(r"^\s*\([^()]{1,40}\)\s*|\s*\([^()]{1,40}\)\s*$")
+_WORD_RE = re.compile(r"\w+")
+_EMPTY = 1 << 32
+
+
+def _fold(text):
+    # NFKD + descarta o que não é ASCII: tira acentos em C, sem laço por caractere
+    return unicodedata.normalize("NFKD", (text or "").lower()).encode("ascii", "ignore").decode("ascii")
+
+
+def question_key(q):
+    """(área, palavras do enunciado sem marcações, alternativas sem ordem)."""
+    stem = _fold(q.get("q"))
+    prev = None
+    while prev != stem:
+        prev = stem
+        stem = _DECOR_RE.sub("", stem)
+    options = frozenset(" ".join(_WORD_RE.findall(_fold(o))) for o in q.get("options") or ())
+    return (q.get("area") or "").strip(), tuple(_WORD_RE.findall(stem)), options
+
+
+def shingles(key):
+    _, stem, options = key
+    out = {" ".join(stem[i:i + SHINGLE]) for i in range(max(1, len(stem) - SHINGLE + 1))}
+    out.update("\x00" + o for o in options)
+    return out
+
+
+def minhash(shingle_set):
+    """Assinatura de NUM_BINS valores: um hash por shingle, mínimo por compartimento."""
+    sig = [_EMPTY] * NUM_BINS
+    for s in shingle_set:
+        h = (zlib.crc32(s.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+        b = h % NUM_BINS
+        v = h // NUM_BINS
+        if v < sig[b]:
+            sig[b] = v
+    # densificação: compartimento vazio copia o próximo preenchido (circular)
+    if _EMPTY in sig and len(set(sig)) > 1:
+        filled = sig[:]
+        for b in range(NUM_BINS):
+            if sig[b] == _EMPTY:
+                step = 1
+                while sig[(b + step) % NUM_BINS] == _EMPTY:
+                    step += 1
+                filled[b] = sig[(b + step) % NUM_BINS] + step * _EMPTY
+        sig = filled
+    return sig
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """
+    Agrupa questões quase iguais do catálogo curado e dos templates do banco
+    gerado (cada template vale por todas as suas variações, que não são
+    materializadas).
+
+    Depois de montado só tem dicionários/tuplas: `cluster_of` e `parts`
+    são O(1).
+    """
+
+    def __init__(self, questions, generated=None, threshold=SIMILARITY):
+        self.threshold = threshold
+        self.generated = generated
+
+        # 1) chave normalizada idêntica: mesmo grupo direto
+        groups = {}
+        for q in questions:
+            groups.setdefault(question_key(q), ([], []))[0].append(q["id"])
+        if generated is not None:
+            for t in range(min(len(generated.templates), len(generated))):
+                rep = generated.get(generated.start_id + t)
+                groups.setdefault(question_key(rep), ([], []))[1].append(t)
+
+        keys = list(groups)
+        parent = list(range(len(keys)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # 2) LSH sobre as chaves distintas; candidatos confirmados pelo Jaccard
+        sets = [shingles(k) for k in keys]
+        buckets = {}
+        for i, key in enumerate(keys):
+            sig = minhash(sets[i])
+            for band in range(BANDS):
+                bucket = buckets.setdefault((key[0], band, tuple(sig[band * ROWS:(band + 1) * ROWS])), [])
+                for j in bucket[:MAX_BUCKET]:
+                    ri, rj = find(i), find(j)
+                    if ri != rj and jaccard(sets[i], sets[j]) >= threshold:
+                        parent[ri] = rj
+                bucket.append(i)
+
+        merged = {}
+        for i in range(len(keys)):
+            ids, templates = merged.setdefault(find(i), ([], []))
+            ids.extend(groups[keys[i]][0])
+            templates.extend(groups[keys[i]][1])
+
+        # 3) só grupos com mais de um membro (ou com template) ficam guardados
+        self._cluster = {}
+        self._template_cluster = {}
+        self._members = {}
+        start = generated.start_id if generated is not None else 0
+        for ids, templates in merged.values():
+            if len(ids) < 2 and not templates:
+                continue
+            ids.sort()
+            templates.sort()
+            cid = min(ids[:1] + [start + t for t in templates[:1]])
+            for qid in ids:
+                self._cluster[qid] = cid
+            for t in templates:
+                self._template_cluster[t] = cid
+            self._members[cid] = (tuple(ids), tuple(templates))
+
+    def __len__(self):
+        return len(self._members)
+
+    def cluster_of(self, qid):
+        cid = self._cluster.get(qid)
+        if cid is not None:
+            return cid
+        g = self.generated
+        if g is not None and qid in g:
+            return self._template_cluster.get(g.template_of(qid), qid)
+        return qid
+
+    def parts(self, cid):
+        """(ids curados, templates) do cluster, ou None se a questão não tem duplicata."""
+        return self._members.get(cid)
+
+    def size(self, cid):
+        entry = self._members.get(cid)
+        if entry is None:
+            return 1
+        ids, templates = entry
+        return len(ids) + (len(self.generated.ids_by_templates(templates)) if templates else 0)
+
+    def clusters(self, min_size=2):
+        """(cid, tamanho, ids curados, templates) dos grupos com pelo menos `min_size` questões."""
+        out = []
+        for cid, (ids, templates) in self._members.items():
+            size = self.size(cid)
+            if size >= min_size:
+                out.append((cid, size, ids, templates))
+        return sorted(out)
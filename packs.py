@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+from assets import write_variants
+from db import LocalConnection
+
+# =========================================================
+# PACOTES OFFLINE POR ÁREA (+ DELTA ENTRE VERSÕES)
+# =========================================================
+# Cada área vira um JSON comprimido em instance/packs/:
+#   <área>.<versão>.json(.gz/.br)   questões com gabarito e explicação
+#   <área>.<versão>.idx.json        {qid: hash da questão}, para o delta
+# A versão é o hash do conteúdo, então a URL do pacote nunca muda de
+# conteúdo e pode ser cacheada para sempre (como os assets do WhiteNoise).
+#
+# Delta: compara o índice da versão que o cliente tem com o atual e devolve
+# só as questões novas/alteradas + os ids removidos. Guardamos os índices
+# das últimas `keep` versões; versão mais antiga que isso baixa o pacote
+# inteiro de novo.
+
+FORMAT = 1
+PACK_RE = re.compile(r"^([a-z0-9-]+)\.([0-9a-f]{12})\.json$")
+
+Pack = namedtuple("Pack", "area slug version filename count size")
+
+
+def area_slug(area):
+    """"Ética" -> "etica", "Direito Civil" -> "direito-civil"."""
+    ascii_name = unicodedata.normalize("NFKD", area or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-") or "area"
+
+
+def pack_question(q, cluster_id):
+    """Campos que o quiz offline precisa (modo treino: gabarito + explicação)."""
+    return {
+        "id": q["id"],
+        "area": q.get("area", ""),
+        "q": q.get("q", ""),
+        "options": list(q.get("options", [])),
+        "answer": q.get("answer", -1),
+        "explain": q.get("explain", ""),
+        "difficulty": q.get("difficulty"),
+        "cluster_id": cluster_id,
+    }
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+class PackStore:
+    """
+    Gera e guarda os pacotes. Por worker só fica em memória o pacote atual
+    de cada área (metadados + índice); os bytes ficam no disco, compartilhados.
+    """
+
+    def __init__(self, directory: str, keep: int = 20):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._current = {}  # área -> (versão do banco, Pack, índice)
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def current(self, area, store_version, questions):
+        """
+        Pacote atual da área. `questions()` (lista de dicts de pack_question)
+        só é chamado quando o banco mudou desde a última vez neste worker.
+        """
+        with self._lock:
+            entry = self._current.get(area)
+            if entry is not None and entry[0] == store_version:
+                return entry[1]
+        pack, index = self._build(area, questions())
+        with self._lock:
+            self._current[area] = (store_version, pack, index)
+        return pack
+
+    def _build(self, area, items):
+        items = sorted(items, key=lambda x: x["id"])
+        index = {str(x["id"]): _digest(_dumps(x).encode("utf-8")) for x in items}
+        version = _digest(_dumps(index).encode("utf-8"))
+        slug = area_slug(area)
+        filename = f"{slug}.{version}.json"
+        path = self.path(filename)
+
+        if not os.path.exists(path):
+            body = _dumps({"format": FORMAT, "area": area, "version": version, "questions": items})
+            # escreve num diretório temporário e só então publica: o .json
+            # aparece por último, quando as variantes já estão no lugar
+            tmp_dir = self.path(f".tmp.{os.getpid()}.{threading.get_ident()}")
+            os.makedirs(tmp_dir, exist_ok=True)
+            try:
+                write_variants(os.path.join(tmp_dir, filename), body.encode("utf-8"))
+                with open(os.path.join(tmp_dir, f"{slug}.{version}.idx.json"), "w", encoding="utf-8") as f:
+                    f.write(_dumps(index))
+                names = sorted(os.listdir(tmp_dir), key=lambda n: n == filename)
+                for name in names:
+                    os.replace(os.path.join(tmp_dir, name), self.path(name))
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            self._prune(slug)
+        else:
+            # versão reaproveitada conta como recente para o _prune
+            os.utime(path)
+
+        return Pack(area, slug, version, filename, len(items), os.path.getsize(path)), index
+
+    def _prune(self, slug):
+        """Mantém só as `keep` versões mais recentes da área."""
+        versions = []
+        for name in os.listdir(self.directory):
+            m = PACK_RE.match(name)
+            if m and m.group(1) == slug:
+                versions.append((os.path.getmtime(self.path(name)), m.group(2)))
+        versions.sort(reverse=True)
+        for _, version in versions[self.keep:]:
+            for suffix in (".json", ".json.gz", ".json.br", ".idx.json"):
+                try:
+                    os.remove(self.path(f"{slug}.{version}{suffix}"))
+                except FileNotFoundError:
+                    pass
+
+    def delta(self, area, since, question):
+        """
+        {version, since, changed: [questões], removed: [ids]} desde a versão
+        `since`, ou None se essa versão não é mais conhecida. `question(qid)`
+        devolve o dict de pack_question da questão atual.
+        """
+        with self._lock:
+            entry = self._current.get(area)
+        if entry is None:
+            return None
+        _, pack, index = entry
+        if not re.fullmatch(r"[0-9a-f]{12}", since or ""):
+            return None
+        if since == pack.version:
+            return {"area": area, "version": pack.version, "since": since, "changed": [], "removed": []}
+        try:
+            with open(self.path(f"{pack.slug}.{since}.idx.json"), encoding="utf-8") as f:
+                old = json.load(f)
+        except (OSError, ValueError):
+            return None
+        changed = [question(int(qid)) for qid, h in index.items() if old.get(qid) != h]
+        removed = [int(qid) for qid in old if qid not in index]
+        return {"area": area, "version": pack.version, "since": since, "changed": changed, "removed": removed}
+
+
+# =========================================================
+# RECIBOS DAS RESPOSTAS OFFLINE (REENVIO IDEMPOTENTE)
+# =========================================================
+# Cada resposta feita offline ganha um id gerado no aparelho. Se a resposta
+# do servidor se perde no caminho, o cliente reenvia o mesmo lote; os ids já
+# vistos (por usuário) são pulados em vez de contar de novo no histórico,
+# no SM-2 e na estatística de itens.
+
+ANSWER_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class AnswerReceipts:
+    """Ids de respostas offline já registradas, em SQLite (instance/offline.sqlite3)."""
+
+    def __init__(self, path: str, ttl: int = 60 * 60 * 24 * 90, sweep_interval: int = 3600):
+        self.path = path
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._conn = LocalConnection(path)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS receipts ("
+            " user_key TEXT NOT NULL,"
+            " answer_id TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " PRIMARY KEY (user_key, answer_id))"
+        )
+
+    def claim(self, user, answer_ids):
+        """Grava os ids e devolve o conjunto dos que ainda não tinham sido vistos."""
+        self._maybe_sweep()
+        now = time.time()
+        fresh = set()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for answer_id in answer_ids:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO receipts (user_key, answer_id, created) VALUES (?, ?, ?)",
+                    (user, answer_id, now),
+                )
+                if cur.rowcount == 1:
+                    fresh.add(answer_id)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return fresh
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self._conn().execute("DELETE FROM receipts WHERE created < ?", (now - self.ttl,))
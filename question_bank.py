@@ -1,4 +1,7 @@
+import hashlib
 import random
+from collections.abc import Sequence
+from functools import lru_cache
 
 def _mk(qid, area, q, options, answer, explain, difficulty="basico", tags=None):
     return {
@@ -12,127 +15,242 @@ def _mk(qid, area, q, options, answer, explain, difficulty="basico", tags=None):
         "tags": tags or []
     }
 
-def _shuffle_options(item):
+def _shuffle_options(item, rng=random):
     """Embaralha alternativas mantendo o gabarito correto."""
     opts = list(item["options"])
     correct_text = opts[item["answer"]]
-    random.shuffle(opts)
+    rng.shuffle(opts)
     item["answer"] = opts.index(correct_text)
     item["options"] = opts
     return item
 
-def generate_extra_questions(start_id: int, target_total: int):
+def nth_permutation(index: int, n: int):
+    """Permutação de range(n) de posição `index` (ordem lexicográfica, código de Lehmer)."""
+    pool = list(range(n))
+    perm = []
+    fact = 1
+    for k in range(2, n):
+        fact *= k
+    index %= fact * n if n else 1
+    for k in range(n - 1, -1, -1):
+        pos, index = divmod(index, fact)
+        perm.append(pool.pop(pos))
+        if k:
+            fact //= k
+    return perm
+
+# ========= TEMPLATES (exemplos) =========
+# Você vai adicionar mais templates com o tempo.
+penal_templates = [
+    ("Direito Penal",
+     "A representação da vítima, nos crimes de ação pública condicionada, em regra, deve ocorrer em:",
+     ["3 meses", "6 meses", "1 ano", "2 anos"], 1,
+     "Regra geral: prazo decadencial de 6 meses a contar do conhecimento da autoria.",
+     "basico", ["ação penal", "representação"]),
+
+    ("Direito Penal",
+     "O recebimento da denúncia ou queixa é marco que, em regra:",
+     ["reduz a pena", "interrompe a prescrição", "extingue o processo", "anula o inquérito"], 1,
+     "Em geral, o recebimento da inicial acusatória é marco interruptivo da prescrição (CP).",
+     "basico", ["prescrição", "marcos"]),
+
+    ("Direito Penal",
+     "A decadência, quando aplicável, tem como efeito principal:",
+     ["reduzir a pena", "extinguir a punibilidade", "aumentar a pena", "suspender o processo"], 1,
+     "Decadência do direito de queixa/representação extingue a punibilidade.",
+     "basico", ["extinção da punibilidade", "decadência"]),
+]
+
+civil_obrigacoes_templates = [
+    ("Direito Civil",
+     "Em obrigações solidárias passivas, o credor pode exigir:",
+     ["apenas parte da dívida", "apenas do devedor mais rico", "a totalidade de qualquer devedor", "somente após sentença"], 2,
+     "Na solidariedade passiva, o credor pode cobrar integralmente de qualquer devedor.",
+     "basico", ["obrigações", "solidariedade"]),
+
+    ("Direito Civil",
+     "A mora do devedor ocorre, em regra, quando:",
+     ["o credor perdoa a dívida", "não paga no tempo, lugar e forma devidos", "há contrato verbal", "existe fiador"], 1,
+     "Mora é atraso culposo no cumprimento: tempo, lugar e forma convencionados.",
+     "basico", ["mora", "inadimplemento"]),
+]
+
+proc_civil_templates = [
+    ("Processo Civil",
+     "O princípio da cooperação no CPC impõe que:",
+     ["apenas o juiz coopere", "todos atuem para decisão justa e efetiva", "o réu sempre confesse", "não haja contraditório"], 1,
+     "CPC/2015 reforça cooperação entre sujeitos do processo para decisão justa.",
+     "basico", ["princípios", "cooperação"]),
+
+    ("Processo Civil",
+     "O Incidente de Desconsideração da Personalidade Jurídica (IDPJ) assegura:",
+     ["prisão civil", "contraditório e ampla defesa", "execução automática", "revelia do sócio"], 1,
+     "Arts. 133–137 do CPC: IDPJ garante contraditório e ampla defesa.",
+     "basico", ["IDPJ", "art. 133-137"]),
+]
+
+constitucional_templates = [
+    ("Direito Constitucional",
+     "Direitos fundamentais possuem, em regra, aplicabilidade:",
+     ["somente após lei", "imediata", "somente em estados", "apenas programática"], 1,
+     "Art. 5º, §1º: normas definidoras têm aplicação imediata.",
+     "basico", ["direitos fundamentais"]),
+
+    ("Direito Constitucional",
+     "O controle difuso de constitucionalidade pode ser realizado por:",
+     ["apenas STF", "qualquer juiz ou tribunal", "apenas Senado", "apenas Presidente"], 1,
+     "No controle difuso, qualquer órgão do Judiciário pode reconhecer inconstitucionalidade no caso concreto.",
+     "basico", ["controle de constitucionalidade"]),
+]
+
+etica_templates = [
+    ("Ética",
+     "No exercício profissional, é eticamente adequado:",
+     ["prometer resultado ao cliente", "guardar sigilo sobre informações sensíveis", "divulgar dados sem consentimento", "aceitar causa com conflito de interesse sem informar"], 1,
+     "Sigilo e proteção de informações são pilares éticos em diversas profissões e na prática jurídica/atendimento.",
+     "basico", ["sigilo", "conduta profissional"]),
+
+    ("Ética",
+     "Conflito de interesses ocorre quando:",
+     ["há mais de um cliente", "há interesse pessoal que compromete imparcialidade", "o processo é complexo", "o juiz é competente"], 1,
+     "Conflito de interesses surge quando interesses pessoais ou de terceiros podem comprometer a atuação profissional.",
+     "basico", ["conflito de interesses"]),
+]
+
+ALL_TEMPLATES = (
+    penal_templates
+    + civil_obrigacoes_templates
+    + proc_civil_templates
+    + constitucional_templates
+    + etica_templates
+)
+
+# ========= GERAÇÃO COM VARIAÇÕES =========
+# A lógica aqui multiplica com pequenas variações de texto/ordem.
+PREFIXES = ["(Nível Básico) ", "(Revisão) ", "(Fixação) ", ""]
+SUFFIXES = ["", " (marque a correta)", " (assinale a alternativa correta)"]
+
+# ids gerados começam aqui, longe do banco curado (estáveis entre deploys)
+GENERATED_BASE_ID = 100000
+
+
+class GeneratedBank:
+    """
+    Banco gerado por templates, determinístico e preguiçoso.
+
+    Nada é armazenado: a questão de id `qid` é materializada sob demanda,
+    derivando template, prefixo, sufixo e ordem das alternativas do próprio id
+    (e da semente). Todos os workers do gunicorn enxergam o mesmo id -> questão.
+    """
+
+    def __init__(self, count: int, seed: int = 0, start_id: int = GENERATED_BASE_ID,
+                 templates=ALL_TEMPLATES, cache_size: int = 4096):
+        self.count = max(0, int(count))
+        self.seed = int(seed)
+        self.start_id = start_id
+        self.templates = tuple(templates)
+        self.get = lru_cache(maxsize=cache_size)(self._materialize)
+
+        # template de cada id = (qid - start_id) % len(templates), então as
+        # questões de uma área/dificuldade/tag formam sequências aritméticas
+        areas, difficulties, tags = {}, {}, {}
+        for t, tpl in enumerate(self.templates):
+            areas.setdefault(tpl[0], []).append(t)
+            difficulties.setdefault(tpl[5], []).append(t)
+            for tag in tpl[6]:
+                tags.setdefault(tag, []).append(t)
+        self._area_templates = {k: tuple(v) for k, v in areas.items()}
+        self._difficulty_templates = {k: tuple(v) for k, v in difficulties.items()}
+        self._tag_templates = {k: tuple(v) for k, v in tags.items()}
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, qid):
+        return isinstance(qid, int) and 0 <= qid - self.start_id < self.count
+
+    def __iter__(self):
+        for qid in range(self.start_id, self.start_id + self.count):
+            yield self.get(qid)
+
+    def areas(self):
+        return tuple(self._area_templates)
+
+    def ids_by_area(self, area: str):
+        return _TemplateIds(self, self._area_templates.get(area, ()))
+
+    def ids_by_difficulty(self, difficulty: str):
+        return _TemplateIds(self, self._difficulty_templates.get(difficulty, ()))
+
+    def ids_by_tag(self, tag: str):
+        return _TemplateIds(self, self._tag_templates.get(tag, ()))
+
+    def ids_by_templates(self, template_idx):
+        return _TemplateIds(self, tuple(sorted(template_idx)))
+
+    def templates_by_area(self, area: str):
+        return self._area_templates.get(area, ())
+
+    def template_of(self, qid: int) -> int:
+        return (qid - self.start_id) % len(self.templates)
+
+    def _variant_bits(self, qid: int) -> int:
+        h = hashlib.blake2b(f"{self.seed}:{qid}".encode(), digest_size=8).digest()
+        return int.from_bytes(h, "big")
+
+    def _materialize(self, qid):
+        if qid not in self:
+            return None
+
+        k = qid - self.start_id
+        area, q_text, options, answer, explain, difficulty, tags = self.templates[k % len(self.templates)]
+
+        bits = self._variant_bits(qid)
+        bits, p = divmod(bits, len(PREFIXES))
+        bits, s = divmod(bits, len(SUFFIXES))
+        perm = nth_permutation(bits, len(options))
+
+        return _mk(
+            qid, area, PREFIXES[p] + q_text + SUFFIXES[s],
+            [options[i] for i in perm], perm.index(answer), explain,
+            difficulty=difficulty, tags=list(tags),
+        )
+
+
+class _TemplateIds(Sequence):
+    """Sequência (len/índice) dos ids gerados a partir de certos templates, sem materializar a lista."""
+
+    def __init__(self, bank: GeneratedBank, template_idx):
+        self._bank = bank
+        self._t = template_idx
+        period = len(bank.templates)
+        full, rest = divmod(bank.count, period)
+        self._len = full * len(template_idx) + sum(1 for t in template_idx if t < rest)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        j, r = divmod(i, len(self._t))
+        return self._bank.start_id + j * len(self._bank.templates) + self._t[r]
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+
+def iter_extra_questions(start_id: int, target_total: int, seed: int = 0):
+    """Versão preguiçosa (gerador) de generate_extra_questions."""
+    bank = GeneratedBank(max(0, target_total - start_id + 1), seed=seed, start_id=start_id, cache_size=0)
+    for qid in range(bank.start_id, bank.start_id + bank.count):
+        yield bank.get(qid)
+
+def generate_extra_questions(start_id: int, target_total: int, seed: int = 0):
     """
     Gera questões extras por templates até chegar em target_total.
     """
-    qid = start_id
-    out = []
-
-    # ========= TEMPLATES (exemplos) =========
-    # Você vai adicionar mais templates com o tempo.
-    penal_templates = [
-        ("Direito Penal",
-         "A representação da vítima, nos crimes de ação pública condicionada, em regra, deve ocorrer em:",
-         ["3 meses", "6 meses", "1 ano", "2 anos"], 1,
-         "Regra geral: prazo decadencial de 6 meses a contar do conhecimento da autoria.",
-         "basico", ["ação penal", "representação"]),
-
-        ("Direito Penal",
-         "O recebimento da denúncia ou queixa é marco que, em regra:",
-         ["reduz a pena", "interrompe a prescrição", "extingue o processo", "anula o inquérito"], 1,
-         "Em geral, o recebimento da inicial acusatória é marco interruptivo da prescrição (CP).",
-         "basico", ["prescrição", "marcos"]),
-
-        ("Direito Penal",
-         "A decadência, quando aplicável, tem como efeito principal:",
-         ["reduzir a pena", "extinguir a punibilidade", "aumentar a pena", "suspender o processo"], 1,
-         "Decadência do direito de queixa/representação extingue a punibilidade.",
-         "basico", ["extinção da punibilidade", "decadência"]),
-    ]
-
-    civil_obrigacoes_templates = [
-        ("Direito Civil",
-         "Em obrigações solidárias passivas, o credor pode exigir:",
-         ["apenas parte da dívida", "apenas do devedor mais rico", "a totalidade de qualquer devedor", "somente após sentença"], 2,
-         "Na solidariedade passiva, o credor pode cobrar integralmente de qualquer devedor.",
-         "basico", ["obrigações", "solidariedade"]),
-
-        ("Direito Civil",
-         "A mora do devedor ocorre, em regra, quando:",
-         ["o credor perdoa a dívida", "não paga no tempo, lugar e forma devidos", "há contrato verbal", "existe fiador"], 1,
-         "Mora é atraso culposo no cumprimento: tempo, lugar e forma convencionados.",
-         "basico", ["mora", "inadimplemento"]),
-    ]
-
-    proc_civil_templates = [
-        ("Processo Civil",
-         "O princípio da cooperação no CPC impõe que:",
-         ["apenas o juiz coopere", "todos atuem para decisão justa e efetiva", "o réu sempre confesse", "não haja contraditório"], 1,
-         "CPC/2015 reforça cooperação entre sujeitos do processo para decisão justa.",
-         "basico", ["princípios", "cooperação"]),
-
-        ("Processo Civil",
-         "O Incidente de Desconsideração da Personalidade Jurídica (IDPJ) assegura:",
-         ["prisão civil", "contraditório e ampla defesa", "execução automática", "revelia do sócio"], 1,
-         "Arts. 133–137 do CPC: IDPJ garante contraditório e ampla defesa.",
-         "basico", ["IDPJ", "art. 133-137"]),
-    ]
-
-    constitucional_templates = [
-        ("Direito Constitucional",
-         "Direitos fundamentais possuem, em regra, aplicabilidade:",
-         ["somente após lei", "imediata", "somente em estados", "apenas programática"], 1,
-         "Art. 5º, §1º: normas definidoras têm aplicação imediata.",
-         "basico", ["direitos fundamentais"]),
-
-        ("Direito Constitucional",
-         "O controle difuso de constitucionalidade pode ser realizado por:",
-         ["apenas STF", "qualquer juiz ou tribunal", "apenas Senado", "apenas Presidente"], 1,
-         "No controle difuso, qualquer órgão do Judiciário pode reconhecer inconstitucionalidade no caso concreto.",
-         "basico", ["controle de constitucionalidade"]),
-    ]
-
-    etica_templates = [
-        ("Ética",
-         "No exercício profissional, é eticamente adequado:",
-         ["prometer resultado ao cliente", "guardar sigilo sobre informações sensíveis", "divulgar dados sem consentimento", "aceitar causa com conflito de interesse sem informar"], 1,
-         "Sigilo e proteção de informações são pilares éticos em diversas profissões e na prática jurídica/atendimento.",
-         "basico", ["sigilo", "conduta profissional"]),
-
-        ("Ética",
-         "Conflito de interesses ocorre quando:",
-         ["há mais de um cliente", "há interesse pessoal que compromete imparcialidade", "o processo é complexo", "o juiz é competente"], 1,
-         "Conflito de interesses surge quando interesses pessoais ou de terceiros podem comprometer a atuação profissional.",
-         "basico", ["conflito de interesses"]),
-    ]
-
-    all_templates = (
-        penal_templates
-        + civil_obrigacoes_templates
-        + proc_civil_templates
-        + constitucional_templates
-        + etica_templates
-    )
-
-    # ========= GERAÇÃO COM VARIAÇÕES =========
-    # A lógica aqui multiplica com pequenas variações de texto/ordem.
-    prefixes = ["(Nível Básico) ", "(Revisão) ", "(Fixação) ", ""]
-    suffixes = ["", " (marque a correta)", " (assinale a alternativa correta)"]
-
-    while (len(out) + start_id - 1) < target_total:
-        base = random.choice(all_templates)
-        area, q_text, options, answer, explain, difficulty, tags = base
-
-        q2 = random.choice(prefixes) + q_text + random.choice(suffixes)
-
-        item = _mk(qid, area, q2, list(options), answer, explain, difficulty=difficulty, tags=list(tags))
-        item = _shuffle_options(item)
-
-        out.append(item)
-        qid += 1
-
-        # Evita loop infinito se target_total for pequeno
-        if qid > start_id + 100000:
-            break
-
-    return out
+    return list(iter_extra_questions(start_id, target_total, seed=seed))
@@ -0,0 +1,271 @@
+import random
+import sys
+from collections.abc import Sequence
+from types import MappingProxyType
+
+from near_dup import NearDuplicateIndex
+
+
+def norm_area(s: str) -> str:
+    """Normaliza texto de área para evitar mismatch por espaços invisíveis."""
+    return (s or "").strip()
+
+
+QUESTION_FIELDS = ("id", "area", "q", "options", "answer", "explain", "difficulty", "tags")
+_FIELD_SET = frozenset(QUESTION_FIELDS)
+# valores curtos e muito repetidos: uma cópia só para o banco todo
+_INTERNED = ("area", "difficulty")
+_MISSING = object()
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+class Question:
+    """
+    Questão imutável com __slots__ (sem __dict__ por instância).
+
+    Tem o mesmo acesso de leitura de um dict (`q["q"]`, `q.get("tags")`,
+    `"explain" in q`), então rotas, templates e índices não mudam. Listas
+    viram tuplas; campos fora do esquema ficam em `extra`.
+    """
+
+    __slots__ = QUESTION_FIELDS + ("extra",)
+
+    def __init__(self, data):
+        set_ = object.__setattr__
+        for field in QUESTION_FIELDS:
+            value = data.get(field)
+            if field in _INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            elif field == "tags" and value:
+                value = tuple(sys.intern(t) for t in value)
+            set_(self, field, _freeze(value))
+        extra = {k: _freeze(v) for k, v in data.items() if k not in _FIELD_SET}
+        set_(self, "extra", MappingProxyType(extra) if extra else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Question é imutável")
+
+    def __delattr__(self, name):
+        raise AttributeError("Question é imutável")
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        for field in QUESTION_FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        if self.extra is not None:
+            yield from self.extra
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(k, self[k]) for k in self]
+
+    def to_dict(self):
+        """dict com listas (formato da fonte/JSON)."""
+        return {k: list(v) if isinstance(v, tuple) else v for k, v in self.items()}
+
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Question(id={self.id!r}, area={self.area!r})"
+
+
+def freeze_questions(questions):
+    """Tupla de Question a partir dos dicts da fonte (já validados)."""
+    return tuple(q if isinstance(q, Question) else Question(q) for q in questions)
+
+
+class QuestionStore:
+    """
+    Catálogo de questões indexado e imutável.
+
+    Construído uma única vez (na carga do banco) e compartilhado por todas as rotas:
+    busca por id é O(1) e os índices por área/dificuldade/tag e as contagens
+    já ficam prontos, sem varrer a lista a cada request.
+
+    `generated` (opcional) é um question_bank.GeneratedBank: suas questões são
+    materializadas sob demanda e seus índices são sequências calculadas.
+
+    Quase-duplicatas (near_dup.py) formam clusters; `sample_distinct` sorteia
+    no máximo uma questão por cluster.
+    """
+
+    def __init__(self, questions, areas, generated=None, version=""):
+        by_id = {}
+        by_area = {}
+        by_difficulty = {}
+        by_tag = {}
+
+        for q in questions:
+            qid = q.get("id")
+            if qid is None or qid in by_id:
+                continue
+            by_id[qid] = q
+
+            area = norm_area(q.get("area"))
+            by_area.setdefault(area, []).append(qid)
+
+            difficulty = q.get("difficulty")
+            if difficulty:
+                by_difficulty.setdefault(difficulty, []).append(qid)
+
+            for tag in q.get("tags") or ():
+                by_tag.setdefault(tag, []).append(qid)
+
+        self.areas = tuple(norm_area(a) for a in areas)
+        self._areas_set = frozenset(self.areas)
+        self._by_id = by_id
+        self._by_area = {k: tuple(v) for k, v in by_area.items()}
+        self._by_difficulty = {k: tuple(v) for k, v in by_difficulty.items()}
+        self._by_tag = {k: tuple(v) for k, v in by_tag.items()}
+        self.generated = generated
+        self.version = version
+
+        # contagens da home: calculadas uma vez
+        self.counts = MappingProxyType(
+            {a: len(self.ids_by_area(a)) for a in self.areas}
+        )
+        self.total = len(by_id) + (len(generated) if generated else 0)
+
+        # clusters de quase-duplicatas e, por área, a lista de clusters
+        # (unidade de sorteio: uma questão por cluster)
+        self.duplicates = NearDuplicateIndex(by_id.values(), generated)
+        self._clusters_by_area = {a: self._area_clusters(a) for a in self.areas}
+
+    def __len__(self):
+        return self.total
+
+    def __contains__(self, qid):
+        return qid in self._by_id or (self.generated is not None and qid in self.generated)
+
+    def __iter__(self):
+        yield from self._by_id.values()
+        if self.generated is not None:
+            yield from self.generated
+
+    def get(self, qid):
+        q = self._by_id.get(qid)
+        if q is None and self.generated is not None:
+            q = self.generated.get(qid)
+        return q
+
+    def is_valid_area(self, area: str) -> bool:
+        return norm_area(area) in self._areas_set
+
+    def _ids(self, static, gen_lookup, key):
+        ids = static.get(key, ())
+        if self.generated is None:
+            return ids
+        return _ChainedIds(ids, gen_lookup(key))
+
+    def ids_by_area(self, area: str):
+        area = norm_area(area)
+        gen = self.generated.ids_by_area if self.generated is not None else None
+        return self._ids(self._by_area, gen, area)
+
+    def ids_by_difficulty(self, difficulty: str):
+        gen = self.generated.ids_by_difficulty if self.generated is not None else None
+        return self._ids(self._by_difficulty, gen, difficulty)
+
+    def ids_by_tag(self, tag: str):
+        gen = self.generated.ids_by_tag if self.generated is not None else None
+        return self._ids(self._by_tag, gen, tag)
+
+    def by_area(self, area: str):
+        return [self.get(qid) for qid in self.ids_by_area(area)]
+
+    # ---------- quase-duplicatas ----------
+    def _area_clusters(self, area):
+        cluster_of = self.duplicates.cluster_of
+        seen = set()
+        out = []
+        ids = self._by_area.get(area, ())
+        if self.generated is not None:
+            g = self.generated
+            ids = list(ids) + [g.start_id + t for t in g.templates_by_area(area) if t < len(g)]
+        for qid in ids:
+            cid = cluster_of(qid)
+            if cid not in seen:
+                seen.add(cid)
+                out.append(cid)
+        return tuple(out)
+
+    def cluster_of(self, qid):
+        return self.duplicates.cluster_of(qid)
+
+    def cluster_members(self, cid):
+        parts = self.duplicates.parts(cid)
+        if parts is None:
+            return (cid,)
+        ids, templates = parts
+        if not templates:
+            return ids
+        return _ChainedIds(ids, self.generated.ids_by_templates(templates))
+
+    def clusters_by_area(self, area: str):
+        return self._clusters_by_area.get(norm_area(area), ())
+
+    def sample_distinct(self, area: str, k: int, rng=random):
+        """Até `k` ids da área sem repetir cluster: sorteia clusters e um membro de cada (O(1) por questão)."""
+        clusters = self.clusters_by_area(area)
+        out = []
+        for cid in rng.sample(clusters, min(k, len(clusters))):
+            members = self.cluster_members(cid)
+            out.append(members[rng.randrange(len(members))] if len(members) > 1 else cid)
+        return out
+
+
+class _ChainedIds(Sequence):
+    """Concatena duas sequências de ids sem copiá-las (serve para random.sample)."""
+
+    def __init__(self, first, second):
+        self._first = first
+        self._second = second
+        self._split = len(first)
+        self._len = self._split + len(second)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        if i < self._split:
+            return self._first[i]
+        return self._second[i - self._split]
+
+    def __iter__(self):
+        yield from self._first
+        yield from self._second
@@ -0,0 +1,188 @@
+import math
+import random
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+import aggregates
+from question_bank import nth_permutation
+
+# =========================================================
+# ESTADO DO QUIZ COMPACTO
+# =========================================================
+# Em vez de uma lista de dicts por resposta, o quiz guarda:
+#   items   -> ids empacotados (uint32 little-endian, 4 bytes/questão)
+#   chosen  -> alternativa marcada, 1 nibble/questão (0 = sem resposta)
+#   hits    -> bitset de acertos (bit i = questão i correta)
+# Placar e tallies saem daí com operações de bit, sem alocar dicts.
+#   agg     -> agregados incrementais (aggregates.py), atualizados a cada resposta
+#   perms   -> (opcional) ordem das alternativas, 1 byte/questão; vira índice
+#              de Lehmer para question_bank.nth_permutation em option_order
+# `chosen` e o gabarito ficam sempre no índice ORIGINAL da alternativa; a
+# ordem embaralhada só existe na tela (render) e na entrada (resposta).
+STATE_VERSION = 2
+
+# 5 alternativas = 120 ordens, cabem no byte. Com 6+ (720+) o byte escolhe
+# 256 ordens espalhadas por todas as k!: índice = byte * k! // 256. As 256
+# primeiras em ordem lexicográfica começariam todas pelas alternativas 0-2.
+MAX_PERM_INDEX = 256
+
+_ID_TYPECODE = "I"
+
+
+def pack_ids(ids) -> bytes:
+    return array(_ID_TYPECODE, ids).tobytes()
+
+
+def unpack_ids(data: bytes):
+    arr = array(_ID_TYPECODE)
+    arr.frombytes(data)
+    return arr
+
+
+def new_quiz(area: str, mode: str, ids):
+    ids = list(ids)
+    return {
+        "v": STATE_VERSION,
+        "area": area,
+        "mode": mode,
+        "n": len(ids),
+        "pos": 0,
+        "items": pack_ids(ids),
+        "chosen": bytes((len(ids) + 1) // 2),
+        "hits": 0,
+        "agg": aggregates.new_aggregate(),
+    }
+
+
+def random_perms(option_counts, rng=random) -> bytes:
+    """Um índice de permutação sorteado por questão."""
+    return bytes(
+        rng.randrange(min(math.factorial(k), MAX_PERM_INDEX)) if k > 1 else 0
+        for k in option_counts
+    )
+
+
+@lru_cache(maxsize=None)
+def option_order(index: int, n: int):
+    """
+    Tupla posição na tela -> índice original (cacheada: sem alocar por
+    request). `index` é o byte de `perms`; 0 é sempre a ordem original.
+    """
+    total = math.factorial(n)
+    if total > MAX_PERM_INDEX:
+        index = index * total // MAX_PERM_INDEX
+    return tuple(nth_permutation(index, n))
+
+
+def perm_at(quiz, pos: int) -> int:
+    perms = quiz.get("perms")
+    return perms[pos] if perms and pos < len(perms) else 0
+
+
+def order_at(quiz, pos: int, n_options: int):
+    return option_order(perm_at(quiz, pos), n_options)
+
+
+def to_original(order, shown: int) -> int:
+    """Alternativa marcada na tela -> índice original (-1 = sem resposta/inválida)."""
+    return order[shown] if 0 <= shown < len(order) else -1
+
+
+def is_valid(quiz) -> bool:
+    """Sessões antigas (formato lista de dicts) são descartadas."""
+    return isinstance(quiz, dict) and quiz.get("v") == STATE_VERSION
+
+
+def item_at(quiz, pos: int) -> int:
+    return int.from_bytes(quiz["items"][4 * pos:4 * pos + 4], "little")
+
+
+def chosen_at(quiz, pos: int) -> int:
+    """Alternativa marcada na posição `pos` (-1 = tempo esgotado/sem resposta)."""
+    byte = quiz["chosen"][pos >> 1]
+    nib = (byte >> 4) if pos & 1 else (byte & 0x0F)
+    return nib - 1
+
+
+def is_hit(quiz, pos: int) -> bool:
+    return bool((quiz["hits"] >> pos) & 1)
+
+
+def score(quiz) -> int:
+    return quiz["hits"].bit_count()
+
+
+def record_answer(quiz, chosen: int, is_correct: bool):
+    """Grava a resposta da posição atual e avança."""
+    pos = quiz["pos"]
+    nib = chosen + 1 if 0 <= chosen < 15 else 0
+
+    buf = bytearray(quiz["chosen"])
+    if pos & 1:
+        buf[pos >> 1] = (buf[pos >> 1] & 0x0F) | (nib << 4)
+    else:
+        buf[pos >> 1] = (buf[pos >> 1] & 0xF0) | nib
+    quiz["chosen"] = bytes(buf)
+
+    if is_correct:
+        quiz["hits"] |= 1 << pos
+    quiz["pos"] = pos + 1
+
+
+def iter_answers(quiz):
+    """(qid, chosen, is_correct) de cada questão já respondida."""
+    ids = unpack_ids(quiz["items"])
+    hits = quiz["hits"]
+    chosen = quiz["chosen"]
+    for pos in range(quiz["pos"]):
+        byte = chosen[pos >> 1]
+        nib = (byte >> 4) if pos & 1 else (byte & 0x0F)
+        yield ids[pos], nib - 1, bool((hits >> pos) & 1)
+
+
+# linha do gabarito comentado (tupla, sem dict por resposta)
+AnswerDetail = namedtuple(
+    "AnswerDetail", "area q options chosen correct is_correct explain difficulty"
+)
+
+
+def iter_answer_details(quiz, get_question):
+    """Gabarito sob demanda (o template em streaming consome um por vez)."""
+    for qid, chosen, hit in iter_answers(quiz):
+        q = get_question(qid)
+        if not q:
+            continue
+        yield AnswerDetail(
+            q.get("area", ""), q.get("q", ""), q.get("options", []), chosen,
+            q.get("answer", -1), hit, q.get("explain", ""), q.get("difficulty"),
+        )
+
+
+def answer_details(quiz, get_question):
+    return list(iter_answer_details(quiz, get_question))
+
+
+def wrong_ids(quiz):
+    ids = unpack_ids(quiz["items"])
+    hits = quiz["hits"]
+    return [ids[pos] for pos in range(quiz["pos"]) if not (hits >> pos) & 1]
+
+
+def tally_by(quiz, key_of):
+    """
+    Tallies {chave: {"total", "correct"}} agrupando por `key_of(qid)`.
+
+    Monta uma máscara de bits por chave e conta acertos com bit_count().
+    """
+    ids = unpack_ids(quiz["items"])
+    masks = {}
+    for pos in range(quiz["pos"]):
+        k = key_of(ids[pos])
+        masks[k] = masks.get(k, 0) | (1 << pos)
+
+    hits = quiz["hits"]
+    return {
+        k: {"total": m.bit_count(), "correct": (m & hits).bit_count()}
+        for k, m in masks.items()
+    }
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+# =========================================================
+# CACHE DE RENDERIZAÇÃO + GET CONDICIONAL
+# =========================================================
+
+
+class LRUCache:
+    """LRU limitado e thread-safe (por worker)."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def fingerprint(*parts) -> str:
+    """Hash curto e estável das partes (bytes entram crus, o resto via repr)."""
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else repr(p).encode())
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def build_id(*dirs) -> str:
+    """Muda a cada deploy: commit do Render ou, na falta, mtimes dos templates/estáticos."""
+    commit = os.environ.get("RENDER_GIT_COMMIT")
+    if commit:
+        return commit[:12]
+    stamps = []
+    for d in dirs:
+        for root, _, files in os.walk(d):
+            for name in files:
+                try:
+                    stamps.append((name, os.stat(os.path.join(root, name)).st_mtime_ns))
+                except OSError:
+                    pass
+    return fingerprint(*sorted(stamps))[:12]
+
+
+def not_modified(etag: str):
+    """True se o navegador já tem esta versão (If-None-Match, comparação fraca:
+    a compressão troca o ETag por W/"...")."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def cache_stream(chunks, cache, key, max_bytes: int):
+    """
+    Repassa os pedaços de um template em streaming e, se o total couber em
+    `max_bytes`, guarda a página inteira em `cache` ao terminar.
+    """
+    parts = []
+    size = 0
+    for chunk in chunks:
+        if parts is not None:
+            parts.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                parts = None
+        yield chunk
+    if parts is not None:
+        cache.put(key, "".join(parts))
+
+
+def with_etag(response, etag: str):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
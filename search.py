@@ -0,0 +1,191 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+# =========================================================
+# BUSCA TEXTUAL (ÍNDICE INVERTIDO + BM25)
+# =========================================================
+# Normalização para português: minúsculas, sem acentos ("ação" -> "acao")
+# e sem stopwords. O último termo da consulta casa por prefixo
+# (autocomplete) via busca binária na lista ordenada de termos.
+
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em entre era essa esse esta este eu
+foi for ha isso isto ja la lhe mais mas me mesmo na nas nem no nos o os ou
+para pela pelas pelo pelos por qual quando que se sem ser seu sua sao so tambem
+te tem um uma umas uns
+""".split())
+
+# peso de cada campo (tf multiplicado)
+FIELD_WEIGHTS = (("q", 2), ("tags", 2), ("options", 1), ("explain", 1))
+
+K1 = 1.2
+B = 0.75
+MAX_PREFIX_EXPANSION = 50
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos."""
+    text = text or ""
+    if not text.isascii():
+        # NFKD separa o acento da letra; o que não é ASCII vira separador
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return text.lower()
+
+
+def tokenize(text: str):
+    return [t for t in _TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+
+
+def _doc_terms(q):
+    tf = {}
+    for field, weight in FIELD_WEIGHTS:
+        value = q.get(field)
+        if not value:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = " ".join(value)
+        for t in tokenize(value):
+            tf[t] = tf.get(t, 0) + weight
+    return tf
+
+
+class SearchIndex:
+    """
+    Índice invertido em memória: termo -> {qid: tf ponderado}.
+
+    `sync(store)` compara com o banco anterior e só reindexa questões
+    novas/alteradas (reload incremental).
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._terms = []        # ordenada, para prefixo
+        self._doc_len = {}
+        self._docs = {}         # qid -> questão indexada
+        self._total_len = 0
+        self._norm = {}         # qid -> K1 * (1 - B + B * dl / avgdl), refeito no sync
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    # ---------- manutenção ----------
+    def _add(self, q, new_terms):
+        qid = q["id"]
+        tf = _doc_terms(q)
+        for t, n in tf.items():
+            posting = self._postings.get(t)
+            if posting is None:
+                posting = self._postings[t] = {}
+                new_terms.append(t)
+            posting[qid] = n
+        length = sum(tf.values())
+        self._doc_len[qid] = length
+        self._total_len += length
+        self._docs[qid] = q
+
+    def _remove(self, qid):
+        q = self._docs.pop(qid, None)
+        if q is None:
+            return
+        for t in _doc_terms(q):
+            posting = self._postings.get(t)
+            if posting is None:
+                continue
+            posting.pop(qid, None)
+            if not posting:
+                del self._postings[t]
+                i = bisect.bisect_left(self._terms, t)
+                if i < len(self._terms) and self._terms[i] == t:
+                    del self._terms[i]
+        self._total_len -= self._doc_len.pop(qid, 0)
+
+    def sync(self, questions):
+        """Reindexa só o que mudou. Retorna (adicionadas, removidas)."""
+        with self._lock:
+            new = {q["id"]: q for q in questions}
+            removed = [qid for qid in self._docs if qid not in new]
+            for qid in removed:
+                self._remove(qid)
+            added = 0
+            new_terms = []
+            for qid, q in new.items():
+                old = self._docs.get(qid)
+                if old is not None and old == q:
+                    continue
+                if old is not None:
+                    self._remove(qid)
+                self._add(q, new_terms)
+                added += 1
+            if new_terms:
+                self._terms = sorted(set(self._terms).union(new_terms))
+            if added or removed:
+                avgdl = self._total_len / len(self._doc_len) if self._doc_len else 1.0
+                self._norm = {qid: K1 * (1 - B + B * dl / avgdl) for qid, dl in self._doc_len.items()}
+            return added, len(removed)
+
+    # ---------- consulta ----------
+    def expand_prefix(self, prefix, limit=MAX_PREFIX_EXPANSION):
+        """Termos do índice que começam com `prefix` (ordem alfabética)."""
+        i = bisect.bisect_left(self._terms, prefix)
+        out = []
+        while i < len(self._terms) and len(out) < limit and self._terms[i].startswith(prefix):
+            out.append(self._terms[i])
+            i += 1
+        return out
+
+    def suggest(self, text, limit=10):
+        toks = tokenize(text)
+        if not toks:
+            return []
+        last = toks[-1]
+        terms = self.expand_prefix(last, limit=MAX_PREFIX_EXPANSION)
+        terms.sort(key=lambda t: -len(self._postings.get(t, ())))
+        return terms[:limit]
+
+    def search(self, text, limit=20, prefix=True, filter_fn=None):
+        """[(score, qid), ...] em ordem decrescente de BM25."""
+        toks = tokenize(text)
+        if not toks:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            norm = self._norm
+
+            # último termo vale como prefixo (autocomplete)
+            groups = [[t] for t in toks]
+            if prefix:
+                expanded = self.expand_prefix(toks[-1])
+                if expanded:
+                    groups[-1] = expanded
+
+            scores = {}
+            for group in groups:
+                best = {}
+                for t in group:
+                    posting = self._postings.get(t)
+                    if not posting:
+                        continue
+                    df = len(posting)
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (K1 + 1)
+                    get = best.get
+                    for qid, tf in posting.items():
+                        s = idf * tf / (tf + norm[qid])
+                        if s > get(qid, 0.0):
+                            best[qid] = s
+                for qid, s in best.items():
+                    scores[qid] = scores.get(qid, 0.0) + s
+
+        items = scores.items()
+        if filter_fn is not None:
+            items = ((qid, s) for qid, s in items if filter_fn(qid))
+        return [(s, qid) for qid, s in heapq.nlargest(limit, items, key=lambda kv: kv[1])]
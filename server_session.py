@@ -0,0 +1,193 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from db import LocalConnection
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Sessão guardada no servidor; o cookie leva só o id opaco."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+# =========================================================
+# BACKENDS
+# =========================================================
+class MemoryBackend:
+    """
+    LRU com TTL dentro do processo.
+
+    Só serve com 1 worker (cada processo tem seu próprio dicionário).
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            payload, expires = item
+            if expires < time.time():
+                del self._data[sid]
+                return None
+            self._data.move_to_end(sid)
+            return payload
+
+    def set(self, sid, payload, ttl):
+        with self._lock:
+            self._data[sid] = (payload, time.time() + ttl)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            dead = [sid for sid, (_, expires) in self._data.items() if expires < now]
+            for sid in dead:
+                del self._data[sid]
+        return len(dead)
+
+
+class SQLiteBackend:
+    """
+    Arquivo SQLite local em modo WAL.
+
+    Compartilhado entre os workers do gunicorn da mesma máquina
+    (uma conexão por thread).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = LocalConnection(path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " sid TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def get(self, sid):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE sid = ? AND expires >= ?",
+            (sid, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, payload, ttl):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+            (sid, payload, time.time() + ttl),
+        )
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def sweep(self):
+        cur = self._conn().execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+        return cur.rowcount
+
+
+# =========================================================
+# INTERFACE FLASK
+# =========================================================
+class ServerSessionInterface(SessionInterface):
+    """
+    Substitui o cookie assinado do Flask por um id opaco + backend no servidor.
+
+    As rotas continuam usando `session[...]` normalmente. O tamanho do cookie
+    e o custo por request não dependem mais do tamanho do quiz.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, backend, ttl: int = 60 * 60 * 24 * 7, sweep_interval: int = 300):
+        self.backend = backend
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def _new_sid(self):
+        return secrets.token_urlsafe(32)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            payload = self.backend.get(sid)
+            if payload is not None:
+                try:
+                    return ServerSession(self.serializer.loads(payload), sid=sid)
+                except ValueError:
+                    pass
+        return ServerSession(sid=self._new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        self._maybe_sweep()
+
+        if not session:
+            if session.modified and not session.new:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified and not self.should_set_cookie(app, session):
+            return
+
+        if session.modified:
+            self.backend.set(session.sid, self.serializer.dumps(dict(session)), self.ttl)
+
+        response.set_cookie(
+            name,
+            session.sid,
+            max_age=self.ttl,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.backend.sweep()
+
+
+def make_session_interface(kind: str, instance_path: str, ttl: int):
+    """Monta a interface de sessão a partir da configuração (None = cookie padrão do Flask)."""
+    kind = (kind or "").strip().lower()
+    if kind == "memory":
+        return ServerSessionInterface(MemoryBackend(), ttl=ttl)
+    if kind == "sqlite":
+        return ServerSessionInterface(SQLiteBackend(os.path.join(instance_path, "sessions.sqlite3")), ttl=ttl)
+    return None
@@ -0,0 +1,190 @@
+import logging
+import random
+import secrets
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+
+from db import LocalConnection
+from question_store import norm_area
+
+# =========================================================
+# SIMULADO OAB (PROVA LONGA, TODAS AS ÁREAS)
+# =========================================================
+# Amostragem estratificada: cada área é um estrato com cota própria
+# (LEXQUIZ_SIMULADO_QUOTAS). Se uma área não tem questões suficientes, a
+# sobra é redistribuída entre as outras na proporção das cotas.
+#
+# O estado do simulado não vai para a sessão: fica numa tabela SQLite
+# (instance/exams.sqlite3) e a sessão guarda só o id. O prazo é do servidor
+# (`deadline`, epoch); respostas que chegam depois dele + tolerância não valem.
+
+log = logging.getLogger("lexquiz.simulado")
+
+# distribuição padrão para 80 questões (peso aproximado de cada área na 1ª fase)
+DEFAULT_QUOTAS = {
+    "Direito Civil": 16,
+    "Direito Penal": 14,
+    "Direito Constitucional": 14,
+    "Processo Civil": 14,
+    "Processo Penal": 12,
+    "Ética": 10,
+}
+DEFAULT_SIZE = 80
+MAX_SIZE = 200
+# 5 horas para 80 questões
+DEFAULT_SECONDS_PER_QUESTION = 225
+
+
+def parse_quotas(text, areas):
+    """
+    "Direito Civil=16, Ética=10" -> {área: cota}. Áreas fora de `areas` são
+    ignoradas (com aviso); texto vazio devolve DEFAULT_QUOTAS.
+    """
+    if not (text or "").strip():
+        return dict(DEFAULT_QUOTAS)
+    known = {norm_area(a): norm_area(a) for a in areas}
+    quotas = {}
+    for part in text.replace(";", ",").split(","):
+        name, sep, value = part.partition("=")
+        if not sep:
+            continue
+        area = known.get(norm_area(name))
+        try:
+            quota = int(value.strip())
+        except ValueError:
+            quota = -1
+        if area is None or quota < 0:
+            log.warning("cota de simulado ignorada: %r", part.strip())
+            continue
+        quotas[area] = quota
+    return quotas or dict(DEFAULT_QUOTAS)
+
+
+def allocate(quotas, available, n):
+    """
+    Quantas questões sortear de cada área: soma `n` (ou tudo o que existe),
+    proporcional às cotas, sem passar do disponível em nenhuma área.
+
+    Maiores restos a cada rodada; uma área que esgota sai e a sobra volta a
+    ser dividida entre as demais.
+    """
+    alloc = {a: 0 for a, w in quotas.items() if w > 0 and available.get(a, 0) > 0}
+    active = {a: quotas[a] for a in alloc}
+    remaining = min(n, sum(available[a] for a in alloc))
+    while remaining > 0 and active:
+        total_w = sum(active.values())
+        shares = {a: remaining * w / total_w for a, w in active.items()}
+        left = remaining
+        for a, share in shares.items():
+            take = min(int(share), available[a] - alloc[a])
+            alloc[a] += take
+            left -= take
+        for a in sorted(active, key=lambda a: shares[a] - int(shares[a]), reverse=True):
+            if not left:
+                break
+            if alloc[a] < available[a]:
+                alloc[a] += 1
+                left -= 1
+        remaining = left
+        active = {a: w for a, w in active.items() if alloc[a] < available[a]}
+    return alloc
+
+
+def stratified_sample(store, quotas, n, rng=random):
+    """
+    Ids do simulado, agrupados por área na ordem das cotas (como no caderno
+    da prova) e embaralhados dentro de cada área. O(n): sorteio sobre os
+    clusters de cada área (uma questão por cluster de quase-duplicatas), sem
+    copiar os pools.
+    """
+    available = {a: len(store.clusters_by_area(a)) for a in quotas}
+    alloc = allocate(quotas, available, n)
+    ids = []
+    for area in quotas:
+        k = alloc.get(area, 0)
+        if k:
+            ids.extend(store.sample_distinct(area, k, rng=rng))
+    return ids, alloc
+
+
+class ExamConflict(Exception):
+    """O simulado foi alterado por outro request (outra aba) desde a leitura."""
+
+
+class ExamStore:
+    """
+    Simulados em andamento/terminados (SQLite em modo WAL, uma conexão por
+    thread), compartilhado entre os workers.
+
+    Cada linha guarda o estado do quiz serializado e um contador `rev`: a
+    gravação só vale se ninguém gravou desde a leitura (duas abas respondendo
+    a mesma posição não contam a resposta duas vezes).
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, path: str, ttl: int = 60 * 60 * 24 * 30, sweep_interval: int = 300):
+        self.path = path
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._conn = LocalConnection(path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS exams ("
+            " id TEXT PRIMARY KEY,"
+            " uid TEXT,"
+            " rev INTEGER NOT NULL,"
+            " data TEXT NOT NULL,"
+            " deadline REAL NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS exams_expires ON exams (expires)")
+
+    def create(self, quiz, uid=None):
+        """Grava um simulado novo e devolve o id."""
+        self._maybe_sweep()
+        exam_id = secrets.token_urlsafe(16)
+        quiz["rev"] = 0
+        self._conn().execute(
+            "INSERT INTO exams (id, uid, rev, data, deadline, expires) VALUES (?, ?, 0, ?, ?, ?)",
+            (exam_id, uid, self.serializer.dumps(quiz), quiz["deadline"], time.time() + self.ttl),
+        )
+        return exam_id
+
+    def load(self, exam_id):
+        row = self._conn().execute(
+            "SELECT data FROM exams WHERE id = ? AND expires >= ?", (exam_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return self.serializer.loads(row[0])
+        except ValueError:
+            return None
+
+    def save(self, exam_id, quiz):
+        """Grava o estado; ExamConflict se outro request gravou antes."""
+        rev = quiz.get("rev", 0)
+        quiz["rev"] = rev + 1
+        cur = self._conn().execute(
+            "UPDATE exams SET rev = ?, data = ? WHERE id = ? AND rev = ?",
+            (rev + 1, self.serializer.dumps(quiz), exam_id, rev),
+        )
+        if cur.rowcount != 1:
+            quiz["rev"] = rev
+            raise ExamConflict(exam_id)
+
+    def delete(self, exam_id):
+        self._conn().execute("DELETE FROM exams WHERE id = ?", (exam_id,))
+
+    def sweep(self):
+        cur = self._conn().execute("DELETE FROM exams WHERE expires < ?", (time.time(),))
+        return cur.rowcount
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.sweep()
@@ -0,0 +1,350 @@
+import atexit
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from db import LocalConnection, connect
+
+# =========================================================
+# REVISÃO ESPAÇADA (SM-2)
+# =========================================================
+# Cada (usuário, questão) guarda ease, intervalo, repetições e o próximo
+# vencimento. Em memória, cada usuário tem heaps (due, qid) — um geral e um
+# por área — com remoção preguiçosa: pegar as próximas k vencidas custa
+# O(k log n), sem varrer o banco inteiro.
+#
+# /answer só mexe na memória: a linha nova vai para `_pending` (uma por
+# usuário+questão, a última vence) e uma thread grava tudo numa transação a
+# cada `flush_interval` segundos, como o AttemptLog.
+
+DAY = 86400.0
+MIN_EASE = 1.3
+START_EASE = 2.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS srs_state (
+    user_key TEXT NOT NULL,
+    qid INTEGER NOT NULL,
+    ease REAL NOT NULL,
+    interval REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    due REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (user_key, qid)
+);
+CREATE INDEX IF NOT EXISTS srs_state_updated ON srs_state (user_key, updated);
+"""
+
+# outro worker pode ter gravado a mesma questão depois: o mais recente vence
+_UPSERT = (
+    "INSERT INTO srs_state (user_key, qid, ease, interval, reps, due, updated)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (user_key, qid) DO UPDATE SET"
+    " ease = excluded.ease, interval = excluded.interval, reps = excluded.reps,"
+    " due = excluded.due, updated = excluded.updated"
+    " WHERE excluded.updated >= srs_state.updated"
+)
+
+
+def grade_for(is_correct: bool, chosen: int, latency_ms=None) -> int:
+    """Nota SM-2 (0-5) a partir da resposta: tempo esgotado 0, erro 1, acerto 4 (5 se rápido)."""
+    if chosen < 0:
+        return 0
+    if not is_correct:
+        return 1
+    if latency_ms is not None and latency_ms < 8000:
+        return 5
+    return 4
+
+
+def sm2(ease: float, interval: float, reps: int, grade: int):
+    """Um passo do SM-2. Intervalo em dias; erro volta para a fila na hora."""
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    if grade < 3:
+        return ease, 0.0, 0
+    reps += 1
+    if reps == 1:
+        interval = 1.0
+    elif reps == 2:
+        interval = 6.0
+    else:
+        interval = round(interval * ease, 2)
+    return ease, interval, reps
+
+
+class _UserQueue:
+    __slots__ = ("states", "heaps", "stamp", "checked")
+
+    def __init__(self, stamp):
+        self.states = {}    # qid -> [ease, interval, reps, due]
+        self.heaps = {}     # None (todas) / área -> [(due, qid), ...]
+        self.stamp = stamp  # maior `updated` no banco que este worker já conhece
+        self.checked = time.monotonic()  # última comparação com o banco
+
+    def push(self, qid, due, area):
+        heapq.heappush(self.heaps.setdefault(None, []), (due, qid))
+        if area:
+            heapq.heappush(self.heaps.setdefault(area, []), (due, qid))
+
+
+class _LastSeen:
+    """Visão {qid: última resposta} derivada do estado SM-2 (due - intervalo)."""
+
+    __slots__ = ("_states",)
+
+    def __init__(self, states):
+        self._states = states
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, qid, default=None):
+        st = self._states.get(qid)
+        if st is None:
+            return default
+        return st[3] - st[1] * DAY
+
+    def items(self):
+        return [(qid, st[3] - st[1] * DAY) for qid, st in list(self._states.items())]
+
+
+class SpacedRepetition:
+    """
+    Agendador por usuário, persistido em SQLite (WAL) por uma thread de escrita.
+
+    O estado de um usuário é carregado na primeira consulta e mantido num LRU;
+    se outro worker gravou algo depois (coluna `updated`), recarrega — por
+    cima do banco entram as linhas deste worker que ainda não foram gravadas.
+    A comparação com o banco é feita no máximo uma vez por `flush_interval`
+    (o atraso com que as gravações dos outros workers chegam de qualquer
+    jeito), e as gravações do próprio worker avançam o `stamp`.
+    `cluster_of(qid)` (opcional) agrupa quase-duplicatas: a fila entrega no
+    máximo uma questão por cluster.
+    """
+
+    def __init__(self, path: str, area_of, max_users: int = 5000, cluster_of=None,
+                 flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.area_of = area_of
+        self.cluster_of = cluster_of or (lambda qid: qid)
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = LocalConnection(path)
+        self._conn().executescript(SCHEMA)
+
+        self._pending = {}   # usuário -> {qid: linha} ainda não gravadas
+        self._writing = {}   # o lote que a thread está gravando agora
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    # ---------- cache por usuário ----------
+    def _db_stamp(self, user):
+        row = self._conn().execute(
+            "SELECT MAX(updated) FROM srs_state WHERE user_key = ?", (user,)
+        ).fetchone()
+        return row[0] or 0.0
+
+    def _load(self, user, stamp):
+        uq = _UserQueue(stamp)
+        rows = {
+            row[1]: row
+            for row in self._conn().execute(
+                "SELECT user_key, qid, ease, interval, reps, due, updated FROM srs_state"
+                " WHERE user_key = ?", (user,)
+            )
+        }
+        with self._lock:
+            for batch in (self._writing, self._pending):
+                for qid, row in batch.get(user, {}).items():
+                    if qid not in rows or row[6] >= rows[qid][6]:
+                        rows[qid] = row
+        for _, qid, ease, interval, reps, due, _ in rows.values():
+            uq.states[qid] = [ease, interval, reps, due]
+            uq.heaps.setdefault(None, []).append((due, qid))
+            area = self.area_of(qid)
+            if area:
+                uq.heaps.setdefault(area, []).append((due, qid))
+        for h in uq.heaps.values():
+            heapq.heapify(h)
+        return uq
+
+    def _user(self, user):
+        now = time.monotonic()
+        with self._lock:
+            uq = self._users.get(user)
+            if uq is not None and now - uq.checked < self.flush_interval:
+                self._users.move_to_end(user)
+                return uq
+        stamp = self._db_stamp(user)
+        with self._lock:
+            uq = self._users.get(user)
+            if uq is not None and uq.stamp >= stamp:
+                uq.checked = now
+                self._users.move_to_end(user)
+                return uq
+        uq = self._load(user, stamp)
+        with self._lock:
+            self._users[user] = uq
+            self._users.move_to_end(user)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return uq
+
+    # ---------- API ----------
+    def update(self, user, qid, grade: int, now=None, answered_at=None):
+        """
+        Atualização incremental após cada resposta. Só toca a memória (e o
+        banco se o usuário não está no cache); a gravação fica para a thread.
+
+        `answered_at` é a hora informada pelo cliente (respostas offline). O
+        agendamento e o `updated` usam sempre a hora do servidor: um relógio
+        adiantado no aparelho mascararia gravações de outros workers. Uma
+        resposta mais antiga que a última revisão já registrada chegou
+        atrasada e não move a questão.
+        """
+        now = now or time.time()
+        self._ensure_writer()
+        with self._lock:
+            uq = self._users.get(user)
+        if uq is None:
+            uq = self._user(user)
+        with self._lock:
+            st = uq.states.get(qid)
+            if st is not None and answered_at is not None and answered_at < st[3] - st[1] * DAY:
+                return
+            ease, interval, reps, _ = st or (START_EASE, 0.0, 0, now)
+            ease, interval, reps = sm2(ease, interval, reps, grade)
+            due = now + interval * DAY
+            uq.states[qid] = [ease, interval, reps, due]
+            uq.push(qid, due, self.area_of(qid))
+            # uq.stamp só anda quando a thread grava (ver _drain)
+            self._pending.setdefault(user, {})[qid] = (user, qid, ease, interval, reps, due, now)
+
+    def due(self, user, k: int, area=None, now=None, exclude=()):
+        """Até `k` questões vencidas (mais atrasadas primeiro, uma por cluster)."""
+        now = now or time.time()
+        uq = self._user(user)
+        out = []
+        with self._lock:
+            heap = uq.heaps.get(area)
+            if not heap:
+                return out
+            popped = []
+            seen = set()
+            clusters = set()
+            while heap and len(out) < k and heap[0][0] <= now:
+                due, qid = heapq.heappop(heap)
+                st = uq.states.get(qid)
+                if st is None or st[3] != due or qid in seen:
+                    continue  # entrada antiga (já reagendada)
+                seen.add(qid)
+                popped.append((due, qid))
+                cid = self.cluster_of(qid)
+                if qid not in exclude and cid not in clusters:
+                    clusters.add(cid)
+                    out.append(qid)
+            # continuam na fila até serem respondidas
+            for item in popped:
+                heapq.heappush(heap, item)
+
+            # compacta quando o lixo das entradas antigas domina o heap
+            if len(heap) > 4 * len(uq.states) + 64:
+                fresh = [(st[3], q) for q, st in uq.states.items()
+                         if area is None or self.area_of(q) == area]
+                heapq.heapify(fresh)
+                uq.heaps[area] = fresh
+        return out
+
+    def last_seen(self, user):
+        return _LastSeen(self._user(user).states)
+
+    # ---------- thread de escrita ----------
+    def _ensure_writer(self):
+        # a thread não sobrevive ao fork do gunicorn: cria uma por processo
+        # (e uma nova se a anterior morreu)
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._write_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="srs-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _drain(self, conn):
+        with self._write_lock:
+            with self._lock:
+                self._writing, self._pending = self._pending, {}
+            rows = [row for by_qid in self._writing.values() for row in by_qid.values()]
+            try:
+                if rows:
+                    with conn:
+                        # IMMEDIATE: ninguém grava entre a leitura do MAX e o upsert
+                        conn.execute("BEGIN IMMEDIATE")
+                        before = {
+                            user: conn.execute(
+                                "SELECT MAX(updated) FROM srs_state WHERE user_key = ?", (user,)
+                            ).fetchone()[0] or 0.0
+                            for user in self._writing
+                        }
+                        conn.executemany(_UPSERT, rows)
+                    self._advance_stamps(before)
+            except sqlite3.Error:
+                # banco travado além do timeout: volta para a fila (sem passar
+                # por cima de uma resposta mais nova) e tenta no próximo ciclo
+                with self._lock:
+                    for user, by_qid in self._writing.items():
+                        pending = self._pending.setdefault(user, {})
+                        for qid, row in by_qid.items():
+                            pending.setdefault(qid, row)
+                return 0
+            finally:
+                with self._lock:
+                    self._writing = {}
+        return len(rows)
+
+    def _advance_stamps(self, before):
+        """
+        Depois de gravar: se o banco não tinha nada mais novo que o `stamp`
+        do usuário, as linhas novas são só deste worker e o `stamp` pode
+        avançar sem recarregar. Se tinha (outro worker gravou), fica como
+        está e o próximo _user recarrega.
+        """
+        with self._lock:
+            for user, by_qid in self._writing.items():
+                uq = self._users.get(user)
+                if uq is not None and before[user] <= uq.stamp:
+                    uq.stamp = max(uq.stamp, max(row[6] for row in by_qid.values()))
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self._drain(conn)
+            self._drain(conn)
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Grava imediatamente o que está pendente (usado em testes/CLI)."""
+        conn = connect(self.path)
+        try:
+            self._drain(conn)
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout=max(5.0, self.flush_interval * 2))
+        self._thread = None
@@ -1,35 +1,572 @@
 (function () {
   function qs(id){ return document.getElementById(id); }
 
-  // Timer apenas no modo prova
-  var limit = window.LEXQUIZ_TIME_LIMIT;
-  if (!limit) return;
-
+  var app = qs("quizApp");
+  var form = qs("quizForm");
   var bar = qs("timerBar");
   var text = qs("timerText");
-  var start = Date.now();
-  var total = limit * 1000;
-
-  var tick = setInterval(function () {
-    var elapsed = Date.now() - start;
-    var left = Math.max(0, total - elapsed);
-    var pct = left / total;
-
-    if (bar) bar.style.transform = "scaleX(" + pct + ")";
-    if (text) text.textContent = Math.ceil(left / 1000) + "s";
-
-    if (left <= 0) {
-      clearInterval(tick);
-      // Se estourou o tempo, envia sem escolha (vai como -1 no backend)
-      var form = document.querySelector("form.choices");
-      if (form) {
-        var hidden = document.createElement("input");
-        hidden.type = "hidden";
-        hidden.name = "choice";
-        hidden.value = "-1";
-        form.appendChild(hidden);
-        form.submit();
+
+  var limit = window.LEXQUIZ_TIME_LIMIT;
+  var tick = null;
+
+  // =========================================================
+  // PRAZO DO SIMULADO (o servidor é quem decide; aqui só mostra)
+  // =========================================================
+  var timeLeft = window.LEXQUIZ_TIME_LEFT;
+  var clock = qs("examClock");
+  var finishForm = qs("examFinishForm");
+  var onDeadline = function () { if (finishForm) finishForm.submit(); };
+
+  function pad(x) { return (x < 10 ? "0" : "") + x; }
+
+  if (timeLeft !== null && timeLeft !== undefined) {
+    var deadlineAt = Date.now() + timeLeft * 1000;
+    var clockTick = setInterval(function () {
+      var left = Math.max(0, Math.ceil((deadlineAt - Date.now()) / 1000));
+      if (clock) {
+        clock.textContent = Math.floor(left / 3600) + ":" + pad(Math.floor(left % 3600 / 60)) + ":" + pad(left % 60);
+      }
+      if (left <= 0) {
+        clearInterval(clockTick);
+        onDeadline();
+      }
+    }, 1000);
+  }
+
+  // =========================================================
+  // TIMER (modo prova)
+  // =========================================================
+  function stopTimer() {
+    if (tick) clearInterval(tick);
+    tick = null;
+  }
+
+  function startTimer(onTimeout) {
+    stopTimer();
+    if (!limit) return;
+
+    var start = Date.now();
+    var total = limit * 1000;
+
+    tick = setInterval(function () {
+      var elapsed = Date.now() - start;
+      var left = Math.max(0, total - elapsed);
+
+      if (bar) bar.style.width = (left / total * 100) + "%";
+      if (text) text.textContent = Math.ceil(left / 1000) + "s";
+
+      if (left <= 0) {
+        stopTimer();
+        onTimeout();
       }
+    }, 120);
+  }
+
+  // Envio clássico (sem JS/fetch): estourou o tempo -> vai como -1 no backend
+  function classicTimeout() {
+    if (!form) return;
+    var radios = form.querySelectorAll('input[name="choice"]');
+    var checked = form.querySelector('input[name="choice"]:checked');
+    if (!checked) {
+      radios.forEach(function (r) { r.required = false; });
+      var hidden = document.createElement("input");
+      hidden.type = "hidden";
+      hidden.name = "choice";
+      hidden.value = "-1";
+      form.appendChild(hidden);
     }
-  }, 120);
+    form.submit();
+  }
+
+  if (!app || !form || !window.fetch || !window.JSON) {
+    startTimer(classicTimeout);
+    return;
+  }
+
+  // =========================================================
+  // FLUXO NA PÁGINA (API JSON)
+  // =========================================================
+  // Uma requisição por resposta: a resposta já traz feedback e a próxima
+  // questão. No modo prova as questões vêm todas de uma vez e as respostas
+  // entram numa fila enviada em lote (sem esperar o servidor para avançar).
+  var cfg = app.dataset;
+  var feedbackMode = !!cfg.feedback;
+  // simulado: as respostas vão em lotes (não uma requisição por questão)
+  var exam = cfg.mode === "simulado";
+  var SAVE_EVERY = 10;
+  var pos = parseInt(cfg.pos, 10);
+  var n = parseInt(cfg.n, 10);
+  var upcoming = {};
+  var pending = [];
+  var sending = false;
+  var shownAt = Date.now();
+  var finished = false;
+
+  function api(url, body) {
+    return fetch(url, {
+      method: body ? "POST" : "GET",
+      credentials: "same-origin",
+      headers: body ? { "Content-Type": "application/json" } : {},
+      body: body ? JSON.stringify(body) : undefined
+    }).then(function (r) {
+      if (!r.ok) throw new Error("HTTP " + r.status);
+      return r.json();
+    });
+  }
+
+  function letter(i) { return String.fromCharCode(65 + i); }
+
+  function renderQuestion(q) {
+    qs("qPos").textContent = q.pos + 1;
+    qs("qText").textContent = q.q;
+
+    var diff = qs("qDifficulty");
+    if (diff) {
+      diff.textContent = q.difficulty || "";
+      diff.style.display = q.difficulty ? "" : "none";
+    }
+
+    var box = qs("qOptions");
+    box.innerHTML = "";
+    q.options.forEach(function (opt, i) {
+      var label = document.createElement("label");
+      label.className = "option-label";
+      var input = document.createElement("input");
+      input.type = "radio";
+      input.name = "choice";
+      input.value = i;
+      input.required = true;
+      var span = document.createElement("span");
+      var strong = document.createElement("strong");
+      strong.style.marginRight = "8px";
+      strong.style.color = "var(--text-light)";
+      strong.textContent = letter(i) + ")";
+      span.appendChild(strong);
+      span.appendChild(document.createTextNode(" " + opt));
+      label.appendChild(input);
+      label.appendChild(span);
+      box.appendChild(label);
+    });
+
+    pos = q.pos;
+    shownAt = Date.now();
+    qs("clientFeedback").hidden = true;
+    qs("questionCard").hidden = false;
+    startTimer(function () { submitChoice(-1); });
+  }
+
+  function renderFeedback(res, next) {
+    stopTimer();
+    var ok = res.is_correct;
+    qs("cfCard").className = "feedback-card " + (ok ? "fb-correct" : "fb-wrong");
+    qs("cfIcon").className = "fas " + (ok ? "fa-check-circle" : "fa-times-circle");
+    qs("cfTitle").textContent = ok ? "Resposta Correta!" : "Resposta Incorreta.";
+    qs("cfExplain").textContent = res.explain || "";
+    qs("questionCard").hidden = true;
+    qs("clientFeedback").hidden = false;
+
+    qs("cfNext").onclick = function () {
+      if (next) renderQuestion(next);
+      else window.location.href = cfg.resultUrl;
+    };
+  }
+
+  // ---------- modo com feedback: 1 requisição por questão ----------
+  function answerWithFeedback(choice) {
+    var sentAt = Date.now();
+    api(cfg.apiAnswer, { pos: pos, choice: choice, ms: sentAt - shownAt })
+      .then(function (data) {
+        var res = data.results[0];
+        if (!res) { window.location.reload(); return; }
+        renderFeedback(res, data.finished ? null : data.question);
+      })
+      .catch(function () {
+        // sem rede/API: volta para o envio clássico do formulário
+        stopTimer();
+        form.submit();
+      });
+  }
+
+  // ---------- modo prova: fila + envio em lote ----------
+  function flush() {
+    if (sending || !pending.length) return Promise.resolve();
+    sending = true;
+    var batch = pending.slice();
+    return api(cfg.apiAnswer, { answers: batch })
+      .then(function (data) {
+        pending.splice(0, batch.length);
+        sending = false;
+        if (data.expired) {
+          // prazo do servidor estourado: nada mais é aceito
+          pending = [];
+          finished = true;
+          window.location.href = cfg.resultUrl;
+          return;
+        }
+        if (pending.length) return flush();
+      })
+      .catch(function () {
+        sending = false;
+        return new Promise(function (resolve) {
+          setTimeout(function () { resolve(flush()); }, 1500);
+        });
+      });
+  }
+
+  function answerQueued(choice) {
+    pending.push({ pos: pos, choice: choice, ms: Date.now() - shownAt });
+    var next = upcoming[pos + 1];
+
+    if (pos + 1 >= n) {
+      finished = true;
+      stopTimer();
+      qs("questionCard").style.opacity = "0.5";
+      flush().then(function () { window.location.href = cfg.resultUrl; });
+      return;
+    }
+    if (!exam || pending.length >= SAVE_EVERY) flush();
+    if (next) renderQuestion(next);
+    else flush().then(function () { window.location.reload(); });
+  }
+
+  function submitChoice(choice) {
+    if (finished) return;
+    stopTimer();
+    if (feedbackMode) answerWithFeedback(choice);
+    else answerQueued(choice);
+  }
+
+  // fim do prazo ou entrega antecipada: manda o que falta e entrega junto
+  // (reenvio de posição já gravada é ignorado no servidor)
+  function finishExam() {
+    if (finished) return;
+    finished = true;
+    stopTimer();
+    qs("questionCard").style.opacity = "0.5";
+    flush()
+      .then(function () { return api(cfg.apiAnswer, { answers: pending.splice(0), finish: true }); })
+      .then(function () { window.location.href = cfg.resultUrl; })
+      .catch(function () { if (finishForm) finishForm.submit(); });
+  }
+
+  if (exam) {
+    onDeadline = finishExam;
+    if (finishForm) {
+      finishForm.addEventListener("submit", function (ev) {
+        if (ev.defaultPrevented) return;  // cancelou no confirm()
+        ev.preventDefault();
+        finishExam();
+      });
+    }
+  }
+
+  form.addEventListener("submit", function (ev) {
+    ev.preventDefault();
+    var checked = form.querySelector('input[name="choice"]:checked');
+    submitChoice(checked ? parseInt(checked.value, 10) : -1);
+  });
+
+  if (!feedbackMode) {
+    // baixa as próximas questões de uma vez
+    api(cfg.apiQuiz + "?prefetch=all")
+      .then(function (data) {
+        (data.upcoming || []).forEach(function (q) { upcoming[q.pos] = q; });
+      })
+      .catch(function () {});
+  }
+
+  window.addEventListener("beforeunload", function (ev) {
+    if (pending.length) {
+      ev.preventDefault();
+      ev.returnValue = "";
+    }
+  });
+
+  startTimer(function () { submitChoice(-1); });
+})();
+
+// =========================================================
+// OFFLINE: SERVICE WORKER, PACOTES POR ÁREA E FILA DE RESPOSTAS
+// =========================================================
+// Os pacotes (uma área cada, versão = hash do conteúdo) ficam no cache
+// "lexquiz-packs"; atualizar baixa só o delta desde a versão guardada.
+// O modo treino roda inteiro no navegador e as respostas vão para uma fila
+// (localStorage), enviada em lote quando a conexão volta.
+(function () {
+  function qs(id){ return document.getElementById(id); }
+
+  var root = qs("offlineApp") || qs("quizApp");
+  if (!root || !window.fetch || !window.JSON) return;
+  var cfg = root.dataset;
+
+  var PACKS_CACHE = "lexquiz-packs";
+  var SHELL_CACHE = "lexquiz-offline-v1";
+  var QUEUE_KEY = "lexquiz.offlineAnswers";
+  var INDEX_KEY = "lexquiz.packs";
+  var BATCH = 500;
+
+  function load(key, fallback) {
+    try { return JSON.parse(localStorage.getItem(key)) || fallback; } catch (e) { return fallback; }
+  }
+  function store(key, value) {
+    try { localStorage.setItem(key, JSON.stringify(value)); } catch (e) {}
+  }
+
+  if ("serviceWorker" in navigator && cfg.sw) {
+    navigator.serviceWorker.register(cfg.sw).then(function () {
+      // CSS/JS/logo desta página: a primeira visita ainda não passa pelo worker
+      if (!window.caches) return;
+      var urls = [];
+      document.querySelectorAll('link[rel="stylesheet"], link[as="style"], link[rel="icon"], script[src]')
+        .forEach(function (el) { urls.push(el.href || el.src); });
+      caches.open(SHELL_CACHE).then(function (cache) { return cache.addAll(urls); }).catch(function () {});
+    }).catch(function () {});
+  }
+
+  // ---------- fila de respostas ----------
+  var uploading = false;
+
+  // id da resposta: o servidor ignora ids repetidos, então reenviar é seguro
+  function answerId() {
+    var bytes = new Uint8Array(12);
+    if (window.crypto && crypto.getRandomValues) {
+      crypto.getRandomValues(bytes);
+    } else {
+      for (var i = 0; i < bytes.length; i++) bytes[i] = Math.floor(Math.random() * 256);
+    }
+    return Array.prototype.map.call(bytes, function (b) { return ("0" + b.toString(16)).slice(-2); }).join("");
+  }
+
+  function uploadQueue() {
+    var queue = load(QUEUE_KEY, []);
+    if (uploading || !queue.length || !cfg.apiOfflineAnswers || navigator.onLine === false) return;
+    uploading = true;
+    var batch = queue.slice(0, BATCH);
+    fetch(cfg.apiOfflineAnswers, {
+      method: "POST",
+      credentials: "same-origin",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ answers: batch })
+    }).then(function (r) {
+      uploading = false;
+      // 5xx: tenta de novo depois; 4xx: o lote não vai passar nunca, descarta
+      if (!r.ok && r.status >= 500) return;
+      // o que entrou na fila durante o envio fica para o próximo lote
+      store(QUEUE_KEY, load(QUEUE_KEY, []).slice(batch.length));
+      uploadQueue();
+    }).catch(function () { uploading = false; });
+  }
+
+  window.addEventListener("online", uploadQueue);
+  uploadQueue();
+
+  var app = qs("offlineApp");
+  if (!app) return;
+
+  // ---------- pacotes ----------
+  var status = qs("offlineStatus");
+  var areaSelect = qs("offlineArea");
+
+  function packKey(slug) { return "/offline/pack/" + slug; }
+
+  function readPack(slug) {
+    if (!window.caches) return Promise.resolve(null);
+    return caches.open(PACKS_CACHE)
+      .then(function (cache) { return cache.match(packKey(slug)); })
+      .then(function (res) { return res ? res.json() : null; });
+  }
+
+  function writePack(pack) {
+    return caches.open(PACKS_CACHE).then(function (cache) {
+      return cache.put(packKey(pack.slug), new Response(JSON.stringify(pack), {
+        headers: { "Content-Type": "application/json" }
+      }));
+    }).then(function () {
+      var index = load(INDEX_KEY, {});
+      index[pack.slug] = { area: pack.area, version: pack.version, count: pack.questions.length };
+      store(INDEX_KEY, index);
+      return pack;
+    });
+  }
+
+  function getJSON(url) {
+    return fetch(url, { credentials: "same-origin" }).then(function (r) {
+      if (r.status === 410) return null;  // versão antiga demais para delta
+      if (!r.ok) throw new Error("HTTP " + r.status);
+      return r.json();
+    });
+  }
+
+  function fullPack(info) {
+    return getJSON(info.url).then(function (data) {
+      return writePack({ area: info.area, slug: info.slug, version: data.version, questions: data.questions });
+    });
+  }
+
+  function applyDelta(local, delta) {
+    var byId = {};
+    local.questions.forEach(function (q) { byId[q.id] = q; });
+    delta.changed.forEach(function (q) { byId[q.id] = q; });
+    delta.removed.forEach(function (id) { delete byId[id]; });
+    local.questions = Object.keys(byId).map(function (k) { return byId[k]; });
+    local.version = delta.version;
+    return writePack(local);
+  }
+
+  function syncPack(info) {
+    return readPack(info.slug).then(function (local) {
+      if (!local) return fullPack(info);
+      if (local.version === info.version) return local;
+      return getJSON(info.delta_url + "?since=" + local.version).then(function (delta) {
+        return delta ? applyDelta(local, delta) : fullPack(info);
+      });
+    });
+  }
+
+  function syncAll() {
+    if (!window.caches) {
+      status.textContent = "Este navegador não permite guardar as questões offline.";
+      return Promise.resolve();
+    }
+    status.textContent = "Atualizando áreas...";
+    return getJSON(cfg.apiPacks)
+      .then(function (data) { return Promise.all(data.packs.map(syncPack)); })
+      .then(function () { renderAreas(); status.textContent = "Áreas atualizadas."; })
+      .catch(function () { renderAreas(); status.textContent = "Sem conexão: usando as áreas já baixadas."; });
+  }
+
+  function renderAreas() {
+    var index = load(INDEX_KEY, {});
+    var slugs = Object.keys(index);
+    if (!slugs.length) return;
+    areaSelect.innerHTML = "";
+    slugs.sort().forEach(function (slug) {
+      var opt = document.createElement("option");
+      opt.value = slug;
+      opt.textContent = index[slug].area + " (" + index[slug].count + ")";
+      areaSelect.appendChild(opt);
+    });
+  }
+
+  // ---------- quiz treino offline ----------
+  var quiz = null;
+
+  function shuffle(list) {
+    for (var i = list.length - 1; i > 0; i--) {
+      var j = Math.floor(Math.random() * (i + 1));
+      var t = list[i]; list[i] = list[j]; list[j] = t;
+    }
+    return list;
+  }
+
+  // uma questão por cluster de quase-duplicatas, como no servidor
+  function pickQuestions(questions, n) {
+    var seen = {};
+    var out = [];
+    shuffle(questions.slice()).forEach(function (q) {
+      if (out.length >= n || seen[q.cluster_id]) return;
+      seen[q.cluster_id] = true;
+      out.push(q);
+    });
+    return out;
+  }
+
+  function letter(i) { return String.fromCharCode(65 + i); }
+
+  function renderQuestion() {
+    var q = quiz.items[quiz.pos];
+    quiz.order = shuffle(q.options.map(function (_, i) { return i; }));
+    quiz.shownAt = Date.now();
+    qs("qPos").textContent = quiz.pos + 1;
+    qs("qText").textContent = q.q;
+
+    var box = qs("qOptions");
+    box.innerHTML = "";
+    quiz.order.forEach(function (orig, i) {
+      var label = document.createElement("label");
+      label.className = "option-label";
+      var input = document.createElement("input");
+      input.type = "radio";
+      input.name = "choice";
+      input.value = i;
+      input.required = true;
+      var span = document.createElement("span");
+      var strong = document.createElement("strong");
+      strong.style.marginRight = "8px";
+      strong.style.color = "var(--text-light)";
+      strong.textContent = letter(i) + ")";
+      span.appendChild(strong);
+      span.appendChild(document.createTextNode(" " + q.options[orig]));
+      label.appendChild(input);
+      label.appendChild(span);
+      box.appendChild(label);
+    });
+    qs("clientFeedback").hidden = true;
+    qs("questionCard").hidden = false;
+  }
+
+  function answer(shown) {
+    var q = quiz.items[quiz.pos];
+    var chosen = shown >= 0 ? quiz.order[shown] : -1;
+    var ok = chosen === q.answer;
+    if (ok) quiz.score += 1;
+
+    var queue = load(QUEUE_KEY, []);
+    queue.push({ id: answerId(), qid: q.id, choice: chosen, ms: Date.now() - quiz.shownAt, ts: Date.now() / 1000 });
+    store(QUEUE_KEY, queue);
+
+    qs("cfCard").className = "feedback-card " + (ok ? "fb-correct" : "fb-wrong");
+    qs("cfIcon").className = "fas " + (ok ? "fa-check-circle" : "fa-times-circle");
+    qs("cfTitle").textContent = ok ? "Resposta Correta!" : "Resposta Incorreta.";
+    qs("cfExplain").textContent = q.explain || "";
+    qs("questionCard").hidden = true;
+    qs("clientFeedback").hidden = false;
+  }
+
+  function finish() {
+    qs("offlineQuiz").hidden = true;
+    qs("offlineResult").hidden = false;
+    qs("offlineScore").textContent = quiz.score + "/" + quiz.items.length;
+    quiz = null;
+    uploadQueue();
+  }
+
+  qs("offlineForm").addEventListener("submit", function (ev) {
+    ev.preventDefault();
+    var checked = qs("offlineForm").querySelector('input[name="choice"]:checked');
+    answer(checked ? parseInt(checked.value, 10) : -1);
+  });
+
+  qs("cfNext").addEventListener("click", function () {
+    quiz.pos += 1;
+    if (quiz.pos >= quiz.items.length) finish();
+    else renderQuestion();
+  });
+
+  qs("offlineStart").addEventListener("submit", function (ev) {
+    ev.preventDefault();
+    var slug = areaSelect.value;
+    var n = Math.max(5, Math.min(20, parseInt(qs("offlineN").value, 10) || 10));
+    if (!slug) return;
+    readPack(slug).then(function (pack) {
+      if (!pack || !pack.questions.length) { status.textContent = "Baixe a área antes de começar."; return; }
+      quiz = { items: pickQuestions(pack.questions, n), pos: 0, score: 0 };
+      qs("offlineAreaBadge").textContent = pack.area;
+      qs("qTotal").textContent = quiz.items.length;
+      qs("offlineSetup").hidden = true;
+      qs("offlineResult").hidden = true;
+      qs("offlineQuiz").hidden = false;
+      renderQuestion();
+    });
+  });
+
+  qs("offlineAgain").addEventListener("click", function () {
+    qs("offlineResult").hidden = true;
+    qs("offlineSetup").hidden = false;
+  });
+
+  qs("offlineSync").addEventListener("click", syncAll);
+
+  renderAreas();
+  if (navigator.onLine !== false) syncAll();
 })();
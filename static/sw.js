@@ -0,0 +1,71 @@
+// Service worker do LexQuiz: deixa o modo offline (/offline) funcionar sem rede.
+// - /static/build/*: nomes com hash, imutáveis -> cache primeiro
+// - /offline e /api/packs: rede primeiro, cache se estiver sem conexão
+// - qualquer outra página sem rede -> /offline
+// Os pacotes de questões ficam no cache "lexquiz-packs", gravado pelo quiz.js.
+var CACHE = "lexquiz-offline-v1";
+var PACKS_CACHE = "lexquiz-packs";
+var OFFLINE_URL = "/offline";
+
+self.addEventListener("install", function (ev) {
+  ev.waitUntil(
+    caches.open(CACHE)
+      .then(function (cache) { return cache.add(OFFLINE_URL); })
+      .then(function () { return self.skipWaiting(); })
+  );
+});
+
+self.addEventListener("activate", function (ev) {
+  ev.waitUntil(
+    caches.keys()
+      .then(function (keys) {
+        return Promise.all(keys.filter(function (k) {
+          return k.indexOf("lexquiz-") === 0 && k !== CACHE && k !== PACKS_CACHE;
+        }).map(function (k) { return caches.delete(k); }));
+      })
+      .then(function () { return self.clients.claim(); })
+  );
+});
+
+function cacheFirst(req) {
+  return caches.match(req).then(function (hit) {
+    return hit || fetch(req).then(function (res) {
+      if (res.ok) {
+        var copy = res.clone();
+        caches.open(CACHE).then(function (cache) { cache.put(req, copy); });
+      }
+      return res;
+    });
+  });
+}
+
+function networkFirst(req) {
+  return fetch(req)
+    .then(function (res) {
+      if (res.ok) {
+        var copy = res.clone();
+        caches.open(CACHE).then(function (cache) { cache.put(req, copy); });
+      }
+      return res;
+    })
+    .catch(function () {
+      return caches.match(req).then(function (hit) {
+        return hit || Promise.reject(new Error("offline"));
+      });
+    });
+}
+
+self.addEventListener("fetch", function (ev) {
+  var req = ev.request;
+  if (req.method !== "GET") return;
+  var url = new URL(req.url);
+  if (url.origin !== self.location.origin) return;
+
+  if (url.pathname.indexOf("/static/build/") === 0) {
+    ev.respondWith(cacheFirst(req));
+  } else if (url.pathname === OFFLINE_URL || url.pathname === "/api/packs") {
+    ev.respondWith(networkFirst(req));
+  } else if (req.mode === "navigate") {
+    ev.respondWith(fetch(req).catch(function () { return caches.match(OFFLINE_URL); }));
+  }
+});